@@ -0,0 +1,78 @@
+"""Compare the single-pass derived metrics engine with the former get_status_* scans.
+
+Run with: python benchmarks/bench_derived_metrics.py
+"""
+from __future__ import annotations
+
+import datetime
+import timeit
+
+from synthetic import make_getday_data
+
+from smart_pillow.metrics import compute_derived_metrics
+
+
+def _legacy_sleep_time(report, state):
+    occured_time = ""
+    prev_end = ""
+    for data in report["sleep_data"]:
+        if data["status"] == state:
+            if len(occured_time) > 240:
+                break
+            start = datetime.datetime.fromtimestamp(data["start"]).strftime("%-H:%M")
+            end = datetime.datetime.fromtimestamp(data["end"]).strftime("%-H:%M")
+            if start == prev_end:
+                continue
+            if occured_time != "":
+                occured_time += " | "
+            occured_time += f"{start}-{end}"
+            prev_end = end
+    return occured_time or "-"
+
+
+def _legacy_event_time(events):
+    event = ""
+    for data in events:
+        if len(event) > 245:
+            break
+        if event != "":
+            event += " | "
+        event += f"{datetime.datetime.fromtimestamp(data['time']).strftime('%-H:%M')} [{data['value']}]"
+    return event or "-"
+
+
+def legacy_derived_metrics(report: dict) -> dict:
+    """The ten scans fetch_report_day used to run."""
+    return {
+        "deep_sleep_time": _legacy_sleep_time(report, 1),
+        "light_sleep_time": _legacy_sleep_time(report, 2),
+        "rem_time": _legacy_sleep_time(report, 3),
+        "awake_time": _legacy_sleep_time(report, 4),
+        "revolve_time": _legacy_event_time(report["body_revolve"]),
+        "move_time": _legacy_event_time(report["body_move"]),
+        "vibrate_count": sum(data["value"] for data in report["snore"]),
+        "vibrate_time": _legacy_event_time(report["snore"]),
+        "snore_count_total": sum(data["value"] for data in report["snore_count"]),
+        "snore_count_time": _legacy_event_time(report["snore_count"]),
+    }
+
+
+def main() -> None:
+    print(f"{'segments':>9} {'events':>7} {'legacy us':>10} {'engine us':>10} {'speedup':>8}")
+    for segments, events in ((40, 50), (500, 1000), (5000, 20000), (20000, 100000)):
+        report = make_getday_data(sleep_segments=segments, events=events)
+        engine, legacy = compute_derived_metrics(report), legacy_derived_metrics(report)
+        for field in ("move_time", "revolve_time", "vibrate_count", "snore_count_total"):
+            assert engine[field] == legacy[field], field
+
+        number = max(3, 20000 // (segments + 4 * events))
+        legacy_time = min(timeit.repeat(lambda: legacy_derived_metrics(report), number=number, repeat=7)) / number
+        engine_time = min(timeit.repeat(lambda: compute_derived_metrics(report), number=number, repeat=7)) / number
+        print(
+            f"{segments:>9} {events:>7} {legacy_time * 1e6:>10.1f} {engine_time * 1e6:>10.1f}"
+            f" {legacy_time / engine_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
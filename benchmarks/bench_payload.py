@@ -0,0 +1,56 @@
+"""Per-response cost of decoding a getday body and of its debug logging.
+
+Run with: python benchmarks/bench_payload.py
+"""
+from __future__ import annotations
+
+import json
+import logging
+import timeit
+
+from synthetic import make_getday_response
+
+from smart_pillow import payload
+from smart_pillow.payload import TruncatedPayload, json_loads
+
+_LOGGER = logging.getLogger("bench_payload")
+_LOGGER.addHandler(logging.NullHandler())
+_LOGGER.propagate = False
+
+
+def eager_log(resp_json: dict) -> None:
+    """What fetch_report_day used to do, even with debug logging off."""
+    _LOGGER.debug(f"DATA From API {resp_json}")
+
+
+def lazy_log(raw: bytes) -> None:
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        _LOGGER.debug("DATA From API %s", TruncatedPayload(raw))
+
+
+def _time(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    print(f"orjson available: {payload.orjson is not None}")
+    print(f"{'events':>7} {'bytes':>9} {'json us':>9} {'fast us':>9} {'eager log us':>13} {'lazy log us':>12} {'lazy dbg us':>12}")
+    for events in (50, 1000, 10000):
+        response = make_getday_response(sleep_segments=events // 2, events=events)
+        raw = json.dumps(response).encode()
+        number = max(5, 200000 // len(raw))
+
+        stdlib = _time(lambda: json.loads(raw), number)
+        fast = _time(lambda: json_loads(raw), number)
+
+        _LOGGER.setLevel(logging.INFO)
+        eager = _time(lambda: eager_log(response), number)
+        lazy = _time(lambda: lazy_log(raw), number)
+        _LOGGER.setLevel(logging.DEBUG)
+        lazy_debug = _time(lambda: lazy_log(raw), number)
+
+        print(f"{events:>7} {len(raw):>9} {stdlib:>9.1f} {fast:>9.1f} {eager:>13.1f} {lazy:>12.2f} {lazy_debug:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cost of repeated sensor state reads with and without the shared value table.
+
+Requires Home Assistant to be installed.
+Run with: python benchmarks/bench_sensor_values.py
+"""
+from __future__ import annotations
+
+import datetime
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+from synthetic import make_getday_data
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from yudee_smart_pillow.sensor import SUPPORTED_SENSORS, SensorValueTable  # noqa: E402
+from yudee_smart_pillow.smart_pillow.report import NightReport  # noqa: E402
+
+READS_PER_SENSOR = 10
+
+
+def main() -> None:
+    day = datetime.date(2022, 12, 11)
+    api = SimpleNamespace(day_report=NightReport.from_getday(day, make_getday_data(day)))
+    table = SensorValueTable(api)
+    slots = range(len(SUPPORTED_SENSORS))
+
+    def per_read() -> None:
+        report = api.day_report
+        for _ in range(READS_PER_SENSOR):
+            for sensor in SUPPORTED_SENSORS:
+                sensor.value_func(report)
+
+    def table_read() -> None:
+        for _ in range(READS_PER_SENSOR):
+            for slot in slots:
+                table.value(slot)
+
+    def table_new_report() -> None:
+        # Worst case: every read cycle sees a new report
+        api.day_report = NightReport.from_getday(day, data)
+        table_read()
+
+    reads = READS_PER_SENSOR * len(SUPPORTED_SENSORS)
+    number = 2000
+    before = min(timeit.repeat(per_read, number=number, repeat=5)) / number
+    after = min(timeit.repeat(table_read, number=number, repeat=5)) / number
+    print(f"{len(SUPPORTED_SENSORS)} sensors, {READS_PER_SENSOR} reads each")
+    print(f"value_func per read   {before * 1e6:8.1f} us ({before / reads * 1e9:.0f} ns/read)")
+    print(f"value table           {after * 1e6:8.1f} us ({after / reads * 1e9:.0f} ns/read)")
+    print(f"speedup               {before / after:8.1f}x")
+
+    print("per sensor ns/read (value_func / table):")
+    report = api.day_report
+    for slot, sensor in enumerate(SUPPORTED_SENSORS):
+        direct = min(timeit.repeat(lambda: sensor.value_func(report), number=20000, repeat=3)) / 20000
+        cached = min(timeit.repeat(lambda: table.value(slot), number=20000, repeat=3)) / 20000
+        print(f"  {sensor.key:<24} {direct * 1e9:6.0f} / {cached * 1e9:6.0f}")
+
+    data = make_getday_data(day)
+    rebuild = min(timeit.repeat(table_new_report, number=200, repeat=5)) / 200
+    print(f"new report + reads    {rebuild * 1e6:8.1f} us (includes building the NightReport)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Local stand-in for the Mirahome beacon5 cloud.
+
+Serves client/fastlogin and client/beacon/getday with configurable latency,
+error rate and payload size so PillowCloudAPI can be exercised offline.
+
+Run with: python benchmarks/fake_cloud.py --port 8080 --latency 0.2 --error-rate 0.05
+and point PillowCloudAPI(base_url="http://127.0.0.1:8080/beacon5") at it.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+import json
+import random
+
+from aiohttp import web
+
+from synthetic import make_getday_response
+
+BASE_PATH = "/beacon5"
+
+
+@dataclass
+class FakeCloudConfig:
+    """Behaviour of the stand-in."""
+
+    latency: float = 0.05
+    latency_jitter: float = 0.02
+    error_rate: float = 0.0
+    sleep_segments: int = 40
+    events: int = 50
+    seed: int | None = None
+
+
+@dataclass
+class FakeCloudStats:
+    """Requests served by the stand-in."""
+
+    logins: int = 0
+    getdays: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    payload_sizes: list[int] = field(default_factory=list)
+
+
+class FakeCloud:
+    """aiohttp application imitating the beacon5 endpoints."""
+
+    def __init__(self, config: FakeCloudConfig | None = None) -> None:
+        self.config = config or FakeCloudConfig()
+        self.stats = FakeCloudStats()
+        self._rng = random.Random(self.config.seed)
+        # Payloads are generated once per day so generation cost does not skew latency
+        self._payloads: dict[str, bytes] = {}
+        self.app = web.Application()
+        self.app.router.add_post(f"{BASE_PATH}/client/fastlogin", self._fastlogin)
+        self.app.router.add_post(f"{BASE_PATH}/client/beacon/getday", self._getday)
+
+    async def _simulate(self) -> web.Response | None:
+        stats = self.stats
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            delay = self.config.latency + self._rng.uniform(0, self.config.latency_jitter)
+            await asyncio.sleep(delay)
+        finally:
+            stats.in_flight -= 1
+        if self._rng.random() < self.config.error_rate:
+            stats.errors += 1
+            return web.Response(status=503, text="Service Unavailable")
+        return None
+
+    async def _fastlogin(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if (error := await self._simulate()) is not None:
+            return error
+        self.stats.logins += 1
+        return web.json_response({"code": "1000", "msg": "success", "data": f"token-{body['did']}"})
+
+    async def _getday(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if (error := await self._simulate()) is not None:
+            return error
+        if not request.headers.get("token"):
+            return web.json_response({"code": "1004", "msg": "token invalid"})
+
+        self.stats.getdays += 1
+        day = body["day"]
+        if (payload := self._payloads.get(day)) is None:
+            payload = json.dumps(
+                make_getday_response(
+                    day=day,
+                    sleep_segments=self.config.sleep_segments,
+                    events=self.config.events,
+                    seed=self.config.seed,
+                )
+            ).encode()
+            self._payloads[day] = payload
+        self.stats.payload_sizes.append(len(payload))
+        return web.Response(body=payload, content_type="application/json")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+        """Start serving, return the runner and the base_url for PillowCloudAPI."""
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://{host}:{bound_port}{BASE_PATH}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=FakeCloudConfig.latency)
+    parser.add_argument("--latency-jitter", type=float, default=FakeCloudConfig.latency_jitter)
+    parser.add_argument("--error-rate", type=float, default=FakeCloudConfig.error_rate)
+    parser.add_argument("--sleep-segments", type=int, default=FakeCloudConfig.sleep_segments)
+    parser.add_argument("--events", type=int, default=FakeCloudConfig.events)
+    args = parser.parse_args()
+
+    cloud = FakeCloud(
+        FakeCloudConfig(
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            error_rate=args.error_rate,
+            sleep_segments=args.sleep_segments,
+            events=args.events,
+        )
+    )
+    web.run_app(cloud.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Fleet load test of SmartPillowAPICoordinator against the local cloud stand-in.
+
+Runs N simulated pillows through the real coordinator, token manager and
+PillowCloudAPI code and reports polls/sec, p50/p99 refresh latency and event
+loop lag. Requires Home Assistant to be installed.
+
+Run with: python benchmarks/loadtest.py --pillows 50 --duration 30 --latency 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession
+
+from fake_cloud import FakeCloud, FakeCloudConfig
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.config_entries import ConfigEntries, ConfigEntry  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from yudee_smart_pillow import SmartPillowAPICoordinator  # noqa: E402
+from yudee_smart_pillow.const import DOMAIN  # noqa: E402
+from yudee_smart_pillow.smart_pillow.fleet import DEFAULT_MAX_IN_FLIGHT, FleetScheduler  # noqa: E402
+from yudee_smart_pillow.smart_pillow.pillow_api import PillowCloudAPI  # noqa: E402
+from yudee_smart_pillow.smart_pillow.report_cache import ReportCache  # noqa: E402
+from yudee_smart_pillow.smart_pillow.resilience import CircuitBreaker  # noqa: E402
+from yudee_smart_pillow.token_manager import TokenManager  # noqa: E402
+
+LAG_PROBE_INTERVAL = 0.05
+
+
+def _percentile(samples: list[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def _make_entry(index: int) -> ConfigEntry:
+    mac = ":".join(f"{byte:02X}" for byte in (0xAA, 0xBB, 0xCC, index >> 16 & 0xFF, index >> 8 & 0xFF, index & 0xFF))
+    kwargs = {
+        "version": 1,
+        "domain": DOMAIN,
+        "title": f"Load test pillow {index}",
+        "data": {"mac": mac, "cname": f"user{index}", "cnameType": "1", "uid": "loadtest", "sort": "1"},
+        "source": "user",
+    }
+    try:
+        return ConfigEntry(minor_version=1, **kwargs)
+    except TypeError:
+        # Home Assistant before 2024.1 has no minor versions
+        return ConfigEntry(**kwargs)
+
+
+async def _probe_loop_lag(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - LAG_PROBE_INTERVAL)
+
+
+async def run(args: argparse.Namespace) -> None:
+    config_dir = tempfile.mkdtemp(prefix="yudee_loadtest_")
+    hass = HomeAssistant(config_dir)
+    hass.config_entries = ConfigEntries(hass, {})
+
+    runner = None
+    base_url = args.cloud_url
+    if base_url is None:
+        cloud = FakeCloud(
+            FakeCloudConfig(
+                latency=args.latency,
+                latency_jitter=args.latency_jitter,
+                error_rate=args.error_rate,
+                sleep_segments=args.sleep_segments,
+                events=args.events,
+                seed=0,
+            )
+        )
+        runner, base_url = await cloud.start()
+
+    session = ClientSession()
+    token_manager = TokenManager(hass)
+    breaker = CircuitBreaker()
+    fleet = FleetScheduler(max_in_flight=args.max_in_flight)
+    report_cache = ReportCache() if args.cache else None
+
+    coordinators = []
+    for index in range(args.pillows):
+        entry = _make_entry(index)
+        # Registered directly so token writes back to the entry succeed
+        hass.config_entries._entries[entry.entry_id] = entry
+        api = PillowCloudAPI(
+            session,
+            entry.data["cname"],
+            entry.data["cnameType"],
+            entry.data["uid"],
+            entry.data["mac"],
+            entry.data["sort"],
+            report_cache=report_cache,
+            circuit_breaker=breaker,
+            base_url=base_url,
+            fleet=fleet,
+        )
+        coordinators.append(SmartPillowAPICoordinator(hass, entry, api, token_manager, fleet))
+
+    latencies: list[float] = []
+    failures = 0
+    lags: list[float] = []
+    stop = asyncio.Event()
+    deadline = time.perf_counter() + args.duration
+
+    async def poll(coordinator: SmartPillowAPICoordinator) -> None:
+        nonlocal failures
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await coordinator.async_refresh()
+            latencies.append(time.perf_counter() - started)
+            if not coordinator.last_update_success:
+                failures += 1
+            await asyncio.sleep(args.interval)
+
+    lag_probe = asyncio.create_task(_probe_loop_lag(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(poll(coordinator) for coordinator in coordinators))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_probe
+
+    print(f"pillows           {args.pillows}")
+    print(f"polls             {len(latencies)} ({failures} failed)")
+    print(f"polls/sec         {len(latencies) / elapsed:.1f}")
+    print(f"latency p50       {_percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"latency p99       {_percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"loop lag mean     {statistics.fmean(lags) * 1000 if lags else 0:.2f} ms")
+    print(f"loop lag p99      {_percentile(lags, 99) * 1000:.2f} ms")
+    print(f"loop lag max      {max(lags, default=0) * 1000:.2f} ms")
+    print(f"circuit breaker   {breaker.as_dict()}")
+    print(f"fleet             {fleet.as_dict()}")
+    if runner is not None:
+        print(f"cloud             logins={cloud.stats.logins} getdays={cloud.stats.getdays} "
+              f"errors={cloud.stats.errors} peak_in_flight={cloud.stats.peak_in_flight}")
+
+    await session.close()
+    if runner is not None:
+        await runner.cleanup()
+    await hass.async_stop(force=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pillows", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to keep polling")
+    parser.add_argument("--interval", type=float, default=0.0, help="pause between polls of a pillow")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT, help="fleet wide request cap")
+    parser.add_argument("--cache", action="store_true", help="enable the report cache")
+    parser.add_argument("--cloud-url", help="use an external stand-in instead of starting one in-process")
+    parser.add_argument("--latency", type=float, default=FakeCloudConfig.latency)
+    parser.add_argument("--latency-jitter", type=float, default=FakeCloudConfig.latency_jitter)
+    parser.add_argument("--error-rate", type=float, default=FakeCloudConfig.error_rate)
+    parser.add_argument("--sleep-segments", type=int, default=FakeCloudConfig.sleep_segments)
+    parser.add_argument("--events", type=int, default=FakeCloudConfig.events)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
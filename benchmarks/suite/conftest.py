@@ -0,0 +1,48 @@
+"""Shared options and fixtures of the pytest-benchmark suite.
+
+Requires Home Assistant and pytest-benchmark to be installed.
+Run from the benchmarks directory with: python -m pytest
+Every run is saved under .benchmarks with the commit it ran on, compare the
+latest saved run against the working tree with:
+    python -m pytest --benchmark-compare --benchmark-compare-fail=median:10%
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+
+import pytest
+
+from synthetic import make_getday_data
+
+DAY = datetime.date(2022, 12, 11)
+
+# Samples per getday event array, override with --events 50,5000
+DEFAULT_EVENTS = "50,1000"
+SLEEP_SEGMENTS = 40
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--events",
+        default=DEFAULT_EVENTS,
+        help=f"comma separated samples per getday event array (default {DEFAULT_EVENTS})",
+    )
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "events" in metafunc.fixturenames:
+        counts = [int(count) for count in metafunc.config.getoption("events").split(",")]
+        metafunc.parametrize("events", counts, ids=[f"{count}ev" for count in counts])
+
+
+@pytest.fixture
+def getday_data(events: int) -> dict:
+    return make_getday_data(DAY, sleep_segments=SLEEP_SEGMENTS, events=events)
+
+
+@pytest.fixture
+def loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
@@ -0,0 +1,72 @@
+"""Dispatcher fan-out of a new report to the entities of 1, 10 and 100 devices."""
+from __future__ import annotations
+
+import itertools
+import logging
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import DAY
+from synthetic import make_getday_data
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from yudee_smart_pillow.const import DATA_UPDATED
+from yudee_smart_pillow.sensor import (
+    SUPPORTED_SENSORS,
+    TREND_SENSORS,
+    SensorValueTable,
+    SmartPillowSensorAdapter,
+    SmartPillowTrendSensor,
+)
+from yudee_smart_pillow.smart_pillow.report import NightReport
+from yudee_smart_pillow.smart_pillow.trends import TREND_METRICS, TREND_WINDOWS, NightlyTrends
+
+EVENTS = 50
+
+
+async def _add_device(hass: HomeAssistant, index: int, report: NightReport) -> SimpleNamespace:
+    api = SimpleNamespace(did=f"AABBCCDD{index:04X}", mac=f"AA:BB:CC:DD:{index >> 8:02X}:{index & 0xFF:02X}", day_report=report)
+    coordinator = SimpleNamespace(pillow_api=api, trends=NightlyTrends(TREND_METRICS))
+    value_table = SensorValueTable(api)
+    entities = [
+        SmartPillowSensorAdapter(coordinator, sensor, value_table, slot)
+        for slot, sensor in enumerate(SUPPORTED_SENSORS)
+    ] + [SmartPillowTrendSensor(coordinator, sensor, days) for sensor in TREND_SENSORS for days in TREND_WINDOWS]
+    # Written straight to the state machine, without an entity platform
+    for number, entity in enumerate(entities):
+        entity.hass = hass
+        entity.entity_id = f"sensor.pillow_{index}_{number}"
+        await entity.async_added_to_hass()
+    return api
+
+
+@pytest.mark.benchmark(group="dispatch")
+@pytest.mark.parametrize("devices", [1, 10, 100])
+def bench_dispatch_fan_out(benchmark, loop, devices: int) -> None:
+    """Every device gets a new report and its signal, all entities write their state."""
+    # Entities without a platform are reported once, outside of the timed rounds
+    logging.getLogger("homeassistant.helpers.entity").setLevel(logging.ERROR)
+    reports = [NightReport.from_getday(DAY, make_getday_data(DAY, events=EVENTS, seed=seed)) for seed in (0, 1)]
+    alternating = itertools.cycle(reports)
+
+    async def run() -> None:
+        hass = HomeAssistant(tempfile.mkdtemp(prefix="yudee_bench_"))
+        apis = [await _add_device(hass, index, reports[0]) for index in range(devices)]
+        signals = [DATA_UPDATED.format(api.did) for api in apis]
+
+        def fan_out() -> None:
+            report = next(alternating)
+            for api, signal in zip(apis, signals):
+                api.day_report = report
+                async_dispatcher_send(hass, signal)
+
+        # The sensor callbacks run synchronously inside the send, so the loop does not need to spin
+        fan_out()
+        benchmark(fan_out)
+        # Sensors whose value is the same in both reports never write
+        assert len(hass.states.async_all()) >= devices * len(TREND_SENSORS) * len(TREND_WINDOWS)
+        await hass.async_stop(force=True)
+
+    loop.run_until_complete(run())
@@ -0,0 +1,65 @@
+"""Post-processing of a getday response, from raw bytes to NightReport."""
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from conftest import DAY
+from yudee_smart_pillow.smart_pillow.metrics import compute_derived_metrics
+from yudee_smart_pillow.smart_pillow.payload import json_loads
+from yudee_smart_pillow.smart_pillow.pillow_api import PillowCloudAPI
+from yudee_smart_pillow.smart_pillow.report import NightReport
+
+
+class _StaticResponse:
+    def __init__(self, raw: bytes) -> None:
+        self._raw = raw
+
+    async def __aenter__(self) -> _StaticResponse:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    async def read(self) -> bytes:
+        return self._raw
+
+
+class StaticSession:
+    """Answers every POST with the same body, so only the client side is measured."""
+
+    def __init__(self, raw: bytes) -> None:
+        self._response = _StaticResponse(raw)
+
+    def post(self, url: str, **kwargs) -> _StaticResponse:
+        return self._response
+
+
+@pytest.fixture
+def getday_raw(getday_data: dict) -> bytes:
+    return json.dumps({"code": "1000", "msg": "success", "data": getday_data}).encode()
+
+
+@pytest.mark.benchmark(group="report")
+def bench_json_decode(benchmark, getday_raw: bytes) -> None:
+    benchmark(json_loads, getday_raw)
+
+
+@pytest.mark.benchmark(group="report")
+def bench_derived_metrics(benchmark, getday_data: dict) -> None:
+    benchmark(compute_derived_metrics, getday_data)
+
+
+@pytest.mark.benchmark(group="report")
+def bench_night_report(benchmark, getday_data: dict) -> None:
+    benchmark(NightReport.from_getday, DAY, getday_data)
+
+
+@pytest.mark.benchmark(group="report")
+def bench_fetch_report_day(benchmark, loop, getday_raw: bytes) -> None:
+    """Everything fetch_report_day does after the bytes arrive: retries, breaker, decode, model."""
+    api = PillowCloudAPI(StaticSession(getday_raw), "cname", "1", "uid", "AA:BB:CC:DD:EE:FF", "1")
+
+    report = benchmark(lambda: loop.run_until_complete(api.fetch_report_day(DAY)))
+    assert report.day == DAY
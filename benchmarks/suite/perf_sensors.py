@@ -0,0 +1,49 @@
+"""Sensor state reads for every entry of SUPPORTED_SENSORS."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import DAY
+from yudee_smart_pillow.sensor import SUPPORTED_SENSORS, SensorValueTable, SmartPillowSensorAdapter
+from yudee_smart_pillow.smart_pillow.report import NightReport
+
+SENSOR_IDS = [sensor.key for sensor in SUPPORTED_SENSORS]
+
+
+@pytest.fixture
+def report(getday_data: dict) -> NightReport:
+    return NightReport.from_getday(DAY, getday_data)
+
+
+@pytest.mark.benchmark(group="native_value")
+@pytest.mark.parametrize("slot", range(len(SUPPORTED_SENSORS)), ids=SENSOR_IDS)
+def bench_native_value(benchmark, report: NightReport, slot: int) -> None:
+    """Steady state read, what every state write after the first one pays."""
+    api = SimpleNamespace(did="AABBCCDDEEFF", day_report=report)
+    adapter = SmartPillowSensorAdapter(
+        SimpleNamespace(pillow_api=api), SUPPORTED_SENSORS[slot], SensorValueTable(api), slot
+    )
+
+    benchmark(lambda: adapter.native_value)
+
+
+@pytest.mark.benchmark(group="value_func")
+@pytest.mark.parametrize("slot", range(len(SUPPORTED_SENSORS)), ids=SENSOR_IDS)
+def bench_value_func(benchmark, report: NightReport, slot: int) -> None:
+    """The computation behind native_value, paid once per sensor for every new report."""
+    benchmark(SUPPORTED_SENSORS[slot].value_func, report)
+
+
+@pytest.mark.benchmark(group="native_value")
+def bench_value_table_new_report(benchmark, getday_data: dict) -> None:
+    """First read after a new report, which fills the table for every sensor."""
+    api = SimpleNamespace(did="AABBCCDDEEFF", day_report=None)
+    table = SensorValueTable(api)
+
+    def new_report():
+        api.day_report = NightReport.from_getday(DAY, getday_data)
+        return (0,), {}
+
+    benchmark.pedantic(table.value, setup=new_report, rounds=200)
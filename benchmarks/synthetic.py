@@ -0,0 +1,61 @@
+"""Synthetic beacon/getday payloads for benchmarks and the local cloud stand-in."""
+from __future__ import annotations
+
+import datetime
+import random
+import sys
+from pathlib import Path
+
+# Make the HA independent smart_pillow package importable without Home Assistant
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "yudee_smart_pillow"))
+
+EVENT_ARRAYS = ("body_move", "body_revolve", "snore", "snore_count")
+
+
+def make_getday_data(
+    day: datetime.date | str = "2022-12-11",
+    sleep_segments: int = 40,
+    events: int = 50,
+    seed: int | None = 0,
+) -> dict:
+    """Return the data part of a getday response for one night.
+
+    sleep_segments contiguous sleep_data segments start at 22:00 of day,
+    every event array gets events samples spread over the night.
+    """
+    rng = random.Random(seed)
+    if isinstance(day, str):
+        day = datetime.date.fromisoformat(day)
+    bed_time = int(datetime.datetime.combine(day, datetime.time(22)).timestamp())
+
+    sleep_data = []
+    now = bed_time
+    for _ in range(sleep_segments):
+        duration = rng.randint(60, 1800)
+        sleep_data.append({"start": now, "end": now + duration, "status": rng.randint(1, 4)})
+        now += duration
+    wake_up_time = now
+
+    data = {
+        "day": day.isoformat(),
+        "score": rng.randint(50, 100),
+        "go_to_bed_time": bed_time,
+        "wake_up_time": wake_up_time,
+        "heart_beat_avg": rng.randint(50, 80),
+        "breath_avg": rng.randint(10, 20),
+        "awake": {"percentage": 10},
+        "deep": {"percentage": 20},
+        "light": {"percentage": 45},
+        "rem": {"percentage": 25},
+        "sleep_data": sleep_data,
+    }
+    span = max(wake_up_time - bed_time, 1)
+    for name in EVENT_ARRAYS:
+        times = sorted(bed_time + rng.randrange(span) for _ in range(events))
+        data[name] = [{"time": time, "value": rng.randint(1, 5)} for time in times]
+    return data
+
+
+def make_getday_response(**kwargs) -> dict:
+    """Return a complete successful getday response."""
+    return {"code": "1000", "msg": "success", "data": make_getday_data(**kwargs)}
@@ -0,0 +1,123 @@
+"""Single pass derived metrics against the get_status_* scans they replaced."""
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+from yudee_smart_pillow.smart_pillow.metrics import EVENT_FIELDS, compute_derived_metrics
+
+BED_TIME = int(datetime.datetime(2022, 12, 11, 22).timestamp())
+EVENT_ARRAYS = [source for source, _, _ in EVENT_FIELDS]
+
+
+# The scans fetch_report_day ran before the engine, as in benchmarks/bench_derived_metrics.py
+def _legacy_sleep_time(report, state):
+    occured_time = ""
+    prev_end = ""
+    for data in report["sleep_data"]:
+        if data["status"] == state:
+            if len(occured_time) > 240:
+                break
+            start = datetime.datetime.fromtimestamp(data["start"]).strftime("%-H:%M")
+            end = datetime.datetime.fromtimestamp(data["end"]).strftime("%-H:%M")
+            if start == prev_end:
+                continue
+            if occured_time != "":
+                occured_time += " | "
+            occured_time += f"{start}-{end}"
+            prev_end = end
+    return occured_time or "-"
+
+
+def _legacy_event_time(events):
+    event = ""
+    for data in events:
+        if len(event) > 245:
+            break
+        if event != "":
+            event += " | "
+        event += f"{datetime.datetime.fromtimestamp(data['time']).strftime('%-H:%M')} [{data['value']}]"
+    return event or "-"
+
+
+def legacy_derived_metrics(report: dict) -> dict:
+    return {
+        "deep_sleep_time": _legacy_sleep_time(report, 1),
+        "light_sleep_time": _legacy_sleep_time(report, 2),
+        "rem_time": _legacy_sleep_time(report, 3),
+        "awake_time": _legacy_sleep_time(report, 4),
+        "revolve_time": _legacy_event_time(report["body_revolve"]),
+        "move_time": _legacy_event_time(report["body_move"]),
+        "vibrate_count": sum(data["value"] for data in report["snore"]),
+        "vibrate_time": _legacy_event_time(report["snore"]),
+        "snore_count_total": sum(data["value"] for data in report["snore_count"]),
+        "snore_count_time": _legacy_event_time(report["snore_count"]),
+    }
+
+
+def _night(segments: list[tuple[int, int, int]], events: int = 0, step: int = 97) -> dict:
+    """Segments as (start minute, end minute, stage) after bed time, events every step seconds."""
+    report = {
+        "sleep_data": [
+            {"start": BED_TIME + start * 60, "end": BED_TIME + end * 60, "status": stage}
+            for start, end, stage in segments
+        ]
+    }
+    for offset, source in enumerate(EVENT_ARRAYS):
+        report[source] = [
+            {"time": BED_TIME + offset + index * step, "value": index % 5 + 1} for index in range(events)
+        ]
+    return report
+
+
+# No stage ever starts where its previous range ended, so the old scans and the engine agree
+NIGHTS = {
+    "empty": _night([]),
+    "one_each": _night([(0, 10, 2), (10, 25, 1), (25, 40, 3), (40, 41, 4)], events=3),
+    "gaps": _night([(0, 10, 1), (30, 40, 1), (45, 50, 2), (70, 90, 1)], events=1),
+    "unknown_stage": _night([(0, 10, 5), (10, 20, 2)], events=2, step=20),
+    # Long enough that every string stops growing at its cap
+    "capped": _night([(minute, minute + 10, minute // 10 % 4 + 1) for minute in range(0, 4000, 10)], events=400),
+}
+
+
+@pytest.mark.parametrize("name", NIGHTS)
+def test_matches_legacy_scans(name: str) -> None:
+    report = NIGHTS[name]
+
+    assert compute_derived_metrics(report) == legacy_derived_metrics(report)
+
+
+def test_capped_strings_fit_a_state() -> None:
+    derived = compute_derived_metrics(NIGHTS["capped"])
+
+    assert all(len(value) < 255 for value in derived.values() if isinstance(value, str))
+    # The totals keep counting past the end of the capped strings
+    assert derived["vibrate_count"] == sum(index % 5 + 1 for index in range(400))
+
+
+def test_contiguous_ranges_merge() -> None:
+    """The old scans dropped a range starting where the last one of its stage ended, the engine extends it."""
+    report = _night([(0, 10, 1), (10, 25, 1), (25, 40, 2), (40, 50, 1), (50, 55, 1), (55, 60, 1)])
+
+    derived = compute_derived_metrics(report)
+
+    assert derived["deep_sleep_time"] == "22:00-22:25 | 22:40-23:00"
+    assert derived["light_sleep_time"] == "22:25-22:40"
+    assert legacy_derived_metrics(report)["deep_sleep_time"] == "22:00-22:10 | 22:40-22:50 | 22:55-23:00"
+
+
+def test_missing_arrays() -> None:
+    assert compute_derived_metrics({"sleep_data": None}) == {
+        "deep_sleep_time": "-",
+        "light_sleep_time": "-",
+        "rem_time": "-",
+        "awake_time": "-",
+        "revolve_time": "-",
+        "move_time": "-",
+        "vibrate_time": "-",
+        "vibrate_count": 0,
+        "snore_count_time": "-",
+        "snore_count_total": 0,
+    }
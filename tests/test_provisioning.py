@@ -0,0 +1,83 @@
+"""Device list parsing of the bulk provisioning step."""
+from __future__ import annotations
+
+import pytest
+import voluptuous as vol
+
+from yudee_smart_pillow.provisioning import format_mac, is_valid_mac, normalize_mac, parse_devices
+
+DEFAULT_UID = "default"
+
+DEVICES = [
+    {"mac": "aa:bb:cc:dd:ee:01", "cname": "alice", "cnameType": "1", "uid": "uid1", "sort": "1"},
+    {"mac": "AA:BB:CC:DD:EE:02", "cname": "bob", "cnameType": "2", "uid": DEFAULT_UID, "sort": "2"},
+]
+
+PLAIN_CSV = """\
+aa:bb:cc:dd:ee:01,alice,1,uid1,1
+AA:BB:CC:DD:EE:02,bob,2,,2
+"""
+
+HEADER_CSV = """\
+# exported from the app
+sort, mac, cname, uid, cnameType
+
+1, aa:bb:cc:dd:ee:01, alice, uid1, 1
+2, AA-BB-CC-DD-EE-02, bob, , 2
+"""
+
+YAML_LIST = """\
+- mac: "aabbccddee01"
+  cname: alice
+  cnameType: 1
+  uid: uid1
+  sort: 1
+- {mac: "AA:BB:CC:DD:EE:02", cname: bob, cnameType: 2, sort: 2}
+"""
+
+
+@pytest.mark.parametrize("text", [PLAIN_CSV, HEADER_CSV, YAML_LIST], ids=["csv", "header_csv", "yaml"])
+def test_formats_parse_the_same(text: str) -> None:
+    assert parse_devices(text, DEFAULT_UID) == DEVICES
+
+
+def test_empty_list() -> None:
+    assert parse_devices("", DEFAULT_UID) == []
+    assert parse_devices("# nothing yet\n\n", DEFAULT_UID) == []
+
+
+@pytest.mark.parametrize(
+    ("text", "message"),
+    [
+        ("AA:BB:CC:DD:EE,user,1,,1", "device 1: invalid mac"),
+        ("AA:BB:CC:DD:EE:01,user,1,,1\nAA:BB:CC:DD:EE:0G,user,1,,1", "device 2: invalid mac"),
+        ("AA:BB:CC:DD:EE:01,user,1,,1\naabbccddee01,user,1,,1", "device 2: duplicate mac aa:bb:cc:dd:ee:01"),
+        ("mac,cname\nAA:BB:CC:DD:EE:01,user", "device 1: required key not provided"),
+        # Unquoted, YAML reads both as integers
+        ("- {mac: 112233445566, cname: user, cnameType: 1, sort: 1}", "device 1: invalid mac, quote it in YAML"),
+        ("- {mac: 12:34:56:12:34:56, cname: user, cnameType: 1, sort: 1}", "device 1: invalid mac, quote it in YAML"),
+    ],
+)
+def test_invalid_devices(text: str, message: str) -> None:
+    with pytest.raises(vol.Invalid, match=message):
+        parse_devices(text, DEFAULT_UID)
+
+
+@pytest.mark.parametrize(
+    ("mac", "formatted"),
+    [
+        ("aa:bb:cc:dd:ee:ff", "aa:bb:cc:dd:ee:ff"),
+        (" AA:BB:CC:DD:EE:FF ", "AA:BB:CC:DD:EE:FF"),
+        ("aa-bb-cc-dd-ee-ff", "aa:bb:cc:dd:ee:ff"),
+        ("aabbccDDEEFF", "aa:bb:cc:DD:EE:FF"),
+    ],
+)
+def test_format_keeps_the_case(mac: str, formatted: str) -> None:
+    assert format_mac(mac) == formatted
+    assert normalize_mac(mac) == "AA:BB:CC:DD:EE:FF"
+    assert is_valid_mac(mac)
+
+
+@pytest.mark.parametrize("mac", ["", "aabbccddeef", "aa:bb:cc:dd:ee:fg", "aa:bb:cc:dd:eeff:"])
+def test_invalid_macs(mac: str) -> None:
+    assert not is_valid_mac(mac)
@@ -0,0 +1,157 @@
+"""Report cache bounds, finality, expiry and persistence."""
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+from yudee_smart_pillow.smart_pillow.report import NightReport
+from yudee_smart_pillow.smart_pillow.report_cache import (
+    NOT_FINAL_TTL,
+    REPORT_SETTLE_TIME,
+    ReportCache,
+    is_report_final,
+)
+
+OLD_DAY = datetime.date(2022, 12, 1)
+LAST_NIGHT = datetime.date(2022, 12, 11)
+NOW = datetime.datetime(2022, 12, 12, 12).timestamp()
+
+
+def _report(day: datetime.date, score: int = 80, wake_up_time: int | None = None) -> NightReport:
+    return NightReport.from_getday(day, {"score": score, "wake_up_time": wake_up_time})
+
+
+def _days(count: int) -> list[datetime.date]:
+    return [OLD_DAY - datetime.timedelta(days=offset) for offset in range(count)]
+
+
+def _cached_days(cache: ReportCache, did: str) -> list[int]:
+    return [report.day.day for report in cache.reports(did)]
+
+
+def test_device_bound_evicts_least_recently_used() -> None:
+    cache = ReportCache(max_nights_per_device=2)
+    first, second, third = _days(3)
+    cache.put("AAAA", first, _report(first), now=NOW)
+    cache.put("AAAA", second, _report(second), now=NOW)
+    # Reading the first night makes the second the least recently used
+    assert cache.get("AAAA", first) is not None
+    cache.put("AAAA", third, _report(third), now=NOW)
+
+    assert _cached_days(cache, "AAAA") == [29, 1]
+    # Other devices have their own bound
+    cache.put("BBBB", third, _report(third), now=NOW)
+    assert len(cache) == 3
+
+
+def test_overall_bound_across_devices() -> None:
+    cache = ReportCache(max_entries=3, max_nights_per_device=3)
+    for did in ("AAAA", "BBBB"):
+        for day in _days(2):
+            cache.put(did, day, _report(day), now=NOW)
+
+    # AAAA's first night was the least recently used of all four
+    assert _cached_days(cache, "AAAA") == [30]
+    assert _cached_days(cache, "BBBB") == [30, 1]
+
+
+def test_overall_bound_scales_with_devices() -> None:
+    cache = ReportCache(max_entries=4, max_nights_per_device=3, devices=2)
+    for did in ("AAAA", "BBBB"):
+        for day in _days(3):
+            cache.put(did, day, _report(day), now=NOW)
+    assert len(cache) == 6
+
+    # Down to one device the floor applies, the least recently used go first
+    cache.set_devices(1)
+    assert len(cache) == 4
+    assert _cached_days(cache, "AAAA") == [29]
+    cache.set_devices(3)
+    assert len(cache) == 4
+
+
+def test_not_final_served_until_it_expires() -> None:
+    woke = int(NOW) - REPORT_SETTLE_TIME + 60
+    cache = ReportCache()
+    cache.put("AAAA", LAST_NIGHT, _report(LAST_NIGHT, wake_up_time=woke), now=NOW)
+
+    assert cache.get("AAAA", LAST_NIGHT, now=NOW + NOT_FINAL_TTL - 1) is not None
+    assert cache.get("AAAA", LAST_NIGHT, now=NOW + NOT_FINAL_TTL) is None
+    # While the cloud is unavailable the expired night is still the best there is
+    assert cache.get("AAAA", LAST_NIGHT, allow_stale=True, now=NOW + NOT_FINAL_TTL).wake_up_time == woke
+
+    # Once settled the same night is served for good
+    cache.put("AAAA", LAST_NIGHT, _report(LAST_NIGHT, wake_up_time=woke), now=NOW + 60)
+    assert cache.get("AAAA", LAST_NIGHT, now=NOW + 10 * NOT_FINAL_TTL) is not None
+
+
+@pytest.mark.parametrize(
+    ("day", "wake_up_time", "final"),
+    [
+        (datetime.date(2022, 12, 10), None, True),
+        (LAST_NIGHT, None, False),
+        (LAST_NIGHT, int(NOW) - REPORT_SETTLE_TIME, True),
+        (LAST_NIGHT, int(NOW) - REPORT_SETTLE_TIME + 1, False),
+        (datetime.date(2022, 12, 12), None, False),
+    ],
+)
+def test_is_report_final(day: datetime.date, wake_up_time: int | None, final: bool) -> None:
+    assert is_report_final(day, wake_up_time, NOW) is final
+
+
+def test_on_change_only_when_a_night_changed() -> None:
+    changes = []
+    cache = ReportCache(on_change=lambda: changes.append(True))
+
+    cache.put("AAAA", OLD_DAY, _report(OLD_DAY), now=NOW)
+    cache.put("AAAA", OLD_DAY, _report(OLD_DAY), now=NOW)
+    assert len(changes) == 1
+    cache.put("AAAA", OLD_DAY, _report(OLD_DAY, score=81), now=NOW)
+    assert len(changes) == 2
+    cache.get("AAAA", OLD_DAY)
+    assert len(changes) == 2
+
+
+def test_as_dict_round_trip() -> None:
+    cache = ReportCache()
+    for score, day in enumerate(_days(3)):
+        cache.put("AAAA", day, _report(day, score=score), now=NOW)
+
+    restored = ReportCache(max_entries=2, max_nights_per_device=2)
+    restored.load(cache.as_dict())
+
+    # The least recently used entry, OLD_DAY stored first, is dropped to fit
+    assert [report.score for report in restored.reports("AAAA")] == [2, 1]
+    assert restored.get("AAAA", OLD_DAY) is None
+    day = OLD_DAY - datetime.timedelta(days=1)
+    assert restored.get("AAAA", day).as_dict() == cache.get("AAAA", day).as_dict()
+
+
+def test_load_applies_the_device_bound() -> None:
+    """A cache saved with a larger per device bound is cut down per device, not overall."""
+    cache = ReportCache(max_nights_per_device=5)
+    for did in ("AAAA", "BBBB_2"):
+        for day in _days(4):
+            cache.put(did, day, _report(day), now=NOW)
+
+    restored = ReportCache(max_nights_per_device=2)
+    restored.load(cache.as_dict())
+
+    assert _cached_days(restored, "AAAA") == [28, 29]
+    assert _cached_days(restored, "BBBB_2") == [28, 29]
+
+
+def test_load_drops_legacy_entries() -> None:
+    cache = ReportCache()
+    cache.load(
+        {
+            "entries": [
+                ["AAAA_2022-12-01", {"data": {"score": 80}, "fetched": NOW, "final": True}],
+                ["AAAA_2022-11-30", {"report": {"day": "2022-11-30"}, "fetched": NOW, "final": True}],
+            ]
+        }
+    )
+    cache.load(None)
+
+    assert len(cache) == 0
@@ -0,0 +1,109 @@
+"""Circuit breaker state machine, driven by a fake clock."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from aiohttp import ClientConnectionError, ClientResponseError
+import pytest
+
+from yudee_smart_pillow.smart_pillow import resilience
+from yudee_smart_pillow.smart_pillow.resilience import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    backoff_delay,
+    is_transient,
+)
+
+ERROR = ClientConnectionError("down")
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock: SimpleNamespace) -> None:
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure(ERROR)
+    assert breaker.state == STATE_CLOSED
+    # A success in between starts the count again
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure(ERROR)
+    assert breaker.state == STATE_CLOSED
+
+    breaker.record_failure(ERROR)
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+    clock.now += 59.9
+    assert not breaker.allow_request()
+    assert breaker.as_dict()["rejected_calls"] == 2
+    assert breaker.as_dict()["last_error"] == "ClientConnectionError: down"
+
+
+def test_half_open_lets_one_trial_through(clock: SimpleNamespace) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(ERROR)
+
+    clock.now += 60
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+    assert breaker.as_dict()["consecutive_failures"] == 0
+
+
+def test_failed_trial_opens_again(clock: SimpleNamespace) -> None:
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+    for _ in range(5):
+        breaker.record_failure(ERROR)
+
+    clock.now += 60
+    assert breaker.allow_request()
+    breaker.record_failure(ERROR)
+    assert breaker.state == STATE_OPEN
+    # The reset timeout starts over from the failed trial
+    clock.now += 30
+    assert not breaker.allow_request()
+    assert breaker.as_dict()["open_for"] == 30
+
+
+def test_abandoned_trial_frees_the_slot(clock: SimpleNamespace) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(ERROR)
+    clock.now += 60
+
+    assert breaker.allow_request()
+    breaker.abandon()
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_is_transient() -> None:
+    def response_error(status: int) -> ClientResponseError:
+        return ClientResponseError(SimpleNamespace(real_url="http://cloud"), (), status=status)
+
+    assert is_transient(asyncio.TimeoutError())
+    assert is_transient(ERROR)
+    assert is_transient(response_error(429))
+    assert is_transient(response_error(503))
+    assert not is_transient(response_error(404))
+    assert not is_transient(ValueError())
+
+
+@pytest.mark.parametrize(("attempt", "cap"), [(1, 0.5), (2, 1.0), (3, 2.0), (4, 4.0), (5, 5.0), (9, 5.0)])
+def test_backoff_delay_is_capped(monkeypatch: pytest.MonkeyPatch, attempt: int, cap: float) -> None:
+    # Full jitter: anywhere between 0 and the doubling delay, capped at RETRY_MAX_DELAY
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: (low, high))
+    assert backoff_delay(attempt) == (0, cap)
@@ -0,0 +1,105 @@
+"""M4 and sleep stage downsampling of night series."""
+from __future__ import annotations
+
+from array import array
+from collections import defaultdict
+import itertools
+
+import pytest
+
+from yudee_smart_pillow.smart_pillow.series import downsample, downsample_stages
+from yudee_smart_pillow.smart_pillow.timeline import SleepStageTimeline
+
+# Samples on and next to the edges of 60 s buckets, repeated times and flat runs
+SAMPLES = {
+    "single": ([30], [7]),
+    "four_in_a_bucket": ([0, 10, 20, 59], [3, 1, 4, 1]),
+    "edge_burst": ([59, 60, 60, 60, 60, 61, 119, 120], [1, 9, 2, 2, 8, 2, 5, 0]),
+    "flat": (list(range(0, 300, 5)), [1] * 60),
+    "repeated_extremes": ([0, 1, 2, 3, 4, 5], [5, 9, 0, 9, 0, 5]),
+    "sparse": ([0, 600, 6000], [1, 2, 3]),
+}
+
+
+def bucketed_downsample(times: list[int], values: list[int], resolution: int) -> list[list[int]]:
+    """Group every sample into its bucket, then keep first, minimum, maximum and last."""
+    buckets: dict[int, list[int]] = defaultdict(list)
+    for index, time in enumerate(times):
+        buckets[time // resolution].append(index)
+    points = []
+    for bucket in sorted(buckets):
+        indices = buckets[bucket]
+        if len(indices) > 4:
+            bucket_values = [values[index] for index in indices]
+            indices = sorted(
+                {
+                    indices[0],
+                    indices[bucket_values.index(min(bucket_values))],
+                    indices[bucket_values.index(max(bucket_values))],
+                    indices[-1],
+                }
+            )
+        points.extend([times[index], values[index]] for index in indices)
+    return points
+
+
+def test_downsample_examples() -> None:
+    times, values = SAMPLES["edge_burst"]
+    assert downsample(array("q", times), array("l", values), 60) == [
+        [59, 1],
+        [60, 9],
+        [60, 2],
+        [119, 5],
+        [120, 0],
+    ]
+    times, values = SAMPLES["flat"]
+    assert downsample(array("q", times), array("l", values), 60) == [
+        [start + offset, 1] for start in range(0, 300, 60) for offset in (0, 55)
+    ]
+
+
+@pytest.mark.parametrize(("name", "resolution"), list(itertools.product(SAMPLES, (1, 2, 60, 3600))))
+def test_downsample_matches_bucketing(name: str, resolution: int) -> None:
+    times, values = SAMPLES[name]
+    expected = bucketed_downsample(times, values, resolution)
+
+    assert downsample(array("q", times), array("l", values), resolution) == expected
+
+
+def test_downsample_empty() -> None:
+    assert downsample(array("q"), array("l"), 60) == []
+
+
+def test_downsample_keeps_extremes() -> None:
+    times = list(range(0, 600, 10))
+    values = [5] * len(times)
+    values[7], values[40] = 99, -3
+
+    points = downsample(array("q", times), array("l", values), 600)
+
+    assert points == [[0, 5], [70, 99], [400, -3], [590, 5]]
+
+
+@pytest.mark.parametrize(
+    ("segments", "resolution", "expected"),
+    [
+        ([], 60, []),
+        # Starts mid bucket, ends on a bucket edge, with an uncovered bucket between
+        ([(30, 120, 2), (180, 240, 3)], 60, [[30, 2], [120, None], [180, 3]]),
+        # The stage covering most of the bucket wins, ties go to the lowest code
+        ([(0, 40, 4), (40, 60, 1), (60, 90, 3), (90, 120, 2)], 60, [[0, 4], [60, 2]]),
+        # Runs of the same dominant stage merge into one step
+        ([(0, 50, 1), (50, 70, 2), (70, 180, 1)], 60, [[0, 1]]),
+        # A bucket the segments only touch at its start
+        ([(0, 60, 2)], 60, [[0, 2]]),
+        ([(0, 60, 2), (60, 60, 3)], 30, [[0, 2]]),
+        # Coarser than the night
+        ([(3590, 3600, 4), (3600, 3700, 1)], 3600, [[3590, 4], [3600, 1]]),
+    ],
+)
+def test_downsample_stages(segments: list[tuple[int, int, int]], resolution: int, expected: list) -> None:
+    timeline = SleepStageTimeline.from_segments(
+        [{"start": start, "end": end, "status": stage} for start, end, stage in segments]
+    )
+
+    assert downsample_stages(timeline, resolution) == expected
@@ -0,0 +1,144 @@
+"""Interval queries of the sleep stage timeline."""
+from __future__ import annotations
+
+from array import array
+import itertools
+
+import pytest
+
+from yudee_smart_pillow.smart_pillow.timeline import EventTimeline, SleepStageTimeline, stage_summary
+
+# A short night: light, deep, a gap, rem, awake, a zero length light segment and light again
+NIGHT = SleepStageTimeline.from_list(
+    [
+        [100, 160, 220, 260, 300, 300],
+        [160, 200, 260, 300, 300, 400],
+        [2, 1, 3, 4, 2, 2],
+    ]
+)
+
+# Layouts the bisecting can get wrong: one segment, touching repeats, gaps only, zero length segments
+LAYOUTS = {
+    "night": NIGHT,
+    "single": SleepStageTimeline.from_list([[0], [50], [1]]),
+    "repeats": SleepStageTimeline.from_list([[0, 10, 20], [10, 20, 30], [2, 2, 2]]),
+    "gaps": SleepStageTimeline.from_list([[0, 20, 40], [10, 30, 50], [1, 2, 1]]),
+    "zero_length": SleepStageTimeline.from_list([[5, 5, 5], [5, 5, 9], [3, 1, 3]]),
+}
+
+
+def test_night_examples() -> None:
+    assert NIGHT.time_in_stage(2) == 60 + 100
+    assert NIGHT.time_in_stage(1) == 40
+    assert NIGHT.time_in_stage(2, 130, 350) == 30 + 50
+    assert NIGHT.time_in_stage(3, 210, 230) == 10
+    # The gap between 200 and 220 belongs to no stage
+    assert NIGHT.time_in_stages(150, 270) == {1: 40, 2: 10, 3: 40, 4: 10}
+    assert NIGHT.transition_count() == 4
+    assert NIGHT.transition_count(160, 300) == 3
+    assert NIGHT.stage_at(159) == 2
+    assert NIGHT.stage_at(160) == 1
+    assert NIGHT.stage_at(200) is None
+    assert NIGHT.stage_at(300) == 2
+    assert NIGHT.stage_at(400) is None
+
+
+@pytest.mark.parametrize(("start", "end"), [(150, 150), (400, 400), (0, 100), (400, 500), (300, 130)])
+def test_empty_and_outside_ranges(start: int, end: int) -> None:
+    assert sum(NIGHT.time_in_stages(start, end).values()) == 0
+    assert NIGHT.transition_count(start, end) == 0
+
+
+def brute_time_in_stage(timeline: SleepStageTimeline, stage: int, start: int, end: int) -> int:
+    return sum(
+        max(0, min(segment_end, end) - max(segment_start, start))
+        for segment_start, segment_end, segment_stage in zip(timeline.starts, timeline.ends, timeline.stages)
+        if segment_stage == stage
+    )
+
+
+def brute_transition_count(timeline: SleepStageTimeline, start: int, end: int) -> int:
+    stages = timeline.stages
+    return sum(
+        start <= timeline.starts[index] < end for index in range(1, len(stages)) if stages[index] != stages[index - 1]
+    )
+
+
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_every_range_matches_a_scan(name: str) -> None:
+    """Every pair of bounds on, next to and outside the segment edges, reversed ones included."""
+    timeline = LAYOUTS[name]
+    edges = {*timeline.starts, *timeline.ends}
+    bounds = sorted({edge + offset for edge in edges for offset in (-1, 0, 1)})
+
+    for start, end in itertools.product(bounds, repeat=2):
+        for stage in range(1, 5):
+            assert timeline.time_in_stage(stage, start, end) == brute_time_in_stage(timeline, stage, start, end), (
+                stage,
+                start,
+                end,
+            )
+        assert timeline.transition_count(start, end) == brute_transition_count(timeline, start, end), (start, end)
+
+    for instant in bounds:
+        covering = [
+            stage
+            for segment_start, segment_end, stage in zip(timeline.starts, timeline.ends, timeline.stages)
+            if segment_start <= instant < segment_end
+        ]
+        assert timeline.stage_at(instant) == (covering[0] if covering else None), instant
+
+
+def test_empty_timeline() -> None:
+    timeline = SleepStageTimeline.from_segments(None)
+
+    assert len(timeline) == 0
+    assert timeline.start is None and timeline.end is None
+    assert timeline.stage_at(0) is None
+    assert timeline.time_in_stage(1) == 0
+    assert timeline.time_in_stage(1, 0, 100) == 0
+    assert timeline.time_in_stages() == {}
+    assert timeline.transition_count() == 0
+    assert timeline.transition_count(0, 100) == 0
+
+
+def test_from_segments_sorts_and_clips_overlaps() -> None:
+    timeline = SleepStageTimeline.from_segments(
+        [
+            {"start": 100, "end": 250, "status": 2},
+            {"start": 0, "end": 120, "status": 1},
+            {"start": 250, "end": 300, "status": 2},
+        ]
+    )
+
+    assert timeline.as_list() == [[0, 100, 250], [100, 250, 300], [1, 2, 2]]
+    assert timeline.transition_count() == 1
+
+
+def test_stage_summary() -> None:
+    assert stage_summary(NIGHT) == {
+        "start": 100,
+        "end": 400,
+        "seconds_in_stage": {"deep": 40, "light": 160, "rem": 40, "awake": 40},
+        "transitions": 4,
+    }
+    assert stage_summary(NIGHT, 150, 270, at=265) == {
+        "start": 150,
+        "end": 270,
+        "seconds_in_stage": {"deep": 40, "light": 10, "rem": 40, "awake": 10},
+        "transitions": 3,
+        "stage_at": "awake",
+    }
+    assert stage_summary(NIGHT, at=210)["stage_at"] is None
+
+
+def test_round_trip() -> None:
+    restored = SleepStageTimeline.from_list(NIGHT.as_list())
+
+    assert restored.as_list() == NIGHT.as_list()
+    assert restored.time_in_stages() == NIGHT.time_in_stages()
+
+    events = EventTimeline.from_events([{"time": 20, "value": 3}, {"time": 10, "value": 1}])
+    assert EventTimeline.from_list(events.as_list()).as_list() == [[10, 20], [1, 3]]
+    assert events.total == 4
+    assert EventTimeline(array("q"), array("l")).total == 0
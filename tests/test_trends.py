@@ -0,0 +1,154 @@
+"""Rolling trend statistics over worked sequences of nights."""
+from __future__ import annotations
+
+import datetime
+import statistics
+
+import pytest
+
+from yudee_smart_pillow.smart_pillow.report import NightReport
+from yudee_smart_pillow.smart_pillow.trends import TREND_METRICS, TREND_WINDOWS, NightlyTrends, RollingStat, trend_values
+
+METRICS = ("score", "heart_beat_avg")
+FIRST_DAY = datetime.date(2022, 11, 1)
+
+# (day offset, score, heart rate): gaps, a same day amendment, a night older than the
+# newest one, missing values and a jump past both windows
+SCHEDULE = [
+    (0, 80, 60),
+    (1, 90, None),
+    (2, 70, 62),
+    (2, 75, 62),
+    (1, 10, 10),
+    (6, None, 58),
+    (7, 85, 61),
+    (13, 60, 70),
+    (29, 88, 59),
+    (30, 88, 59),
+    (75, 65, 64),
+    (76, None, None),
+]
+
+
+def _day(offset: int) -> datetime.date:
+    return FIRST_DAY + datetime.timedelta(days=offset)
+
+
+def _window(nights: dict[int, dict], newest: int, days: int, metric: str) -> list[float]:
+    return [
+        values[metric]
+        for offset, values in sorted(nights.items())
+        if newest - days < offset <= newest and values[metric] is not None
+    ]
+
+
+def test_worked_example() -> None:
+    trends = NightlyTrends(METRICS)
+    trends.add_night(_day(0), {"score": 80, "heart_beat_avg": 60})
+    trends.add_night(_day(1), {"score": 90})
+    trends.add_night(_day(9), {"score": 70, "heart_beat_avg": 64})
+
+    # Day 9 only reaches back to day 3 for the 7 day window
+    assert trends.stat("score", 7).count == 1
+    assert trends.stat("score", 7).mean == 70
+    assert trends.stat("score", 7).std_dev == 0
+    assert trends.stat("score", 30).mean == pytest.approx(80)
+    assert trends.stat("score", 30).std_dev == pytest.approx(statistics.pstdev([80, 90, 70]))
+    # The night without a heart rate does not count for it
+    assert trends.stat("heart_beat_avg", 30).count == 2
+    assert trends.stat("heart_beat_avg", 30).mean == pytest.approx(62)
+
+
+def test_schedule_matches_recomputing_the_windows() -> None:
+    changes = []
+    trends = NightlyTrends(METRICS, on_change=lambda: changes.append(True))
+    nights: dict[int, dict] = {}
+
+    for offset, score, heart_rate in SCHEDULE:
+        values = {"score": score, "heart_beat_avg": heart_rate}
+        trends.add_night(_day(offset), values)
+        if not nights or offset >= max(nights):
+            nights[offset] = values
+        newest = max(nights)
+
+        for days in TREND_WINDOWS:
+            for metric in METRICS:
+                window = _window(nights, newest, days, metric)
+                stat = trends.stat(metric, days)
+                assert stat.count == len(window), (offset, metric, days)
+                if window:
+                    assert stat.mean == pytest.approx(statistics.fmean(window))
+                    assert stat.std_dev == pytest.approx(statistics.pstdev(window), abs=1e-9)
+                else:
+                    assert stat.std_dev is None
+
+    # Everything but the older night changed the trends
+    assert len(changes) == len(SCHEDULE) - 1
+
+    restored = NightlyTrends(METRICS)
+    restored.load(trends.as_dict())
+    for days in TREND_WINDOWS:
+        for metric in METRICS:
+            assert restored.stat(metric, days).count == trends.stat(metric, days).count
+
+
+def test_trend_values() -> None:
+    report = NightReport.from_getday(
+        FIRST_DAY,
+        {"score": 80, "heart_beat_avg": 60, "go_to_bed_time": 1000, "wake_up_time": 1000 + 7 * 3600 + 200},
+    )
+    assert trend_values(report) == {
+        "score": 80,
+        "heart_beat_avg": 60,
+        "breath_rate_avg": None,
+        "SLEEP_DURATION_HR": 7.1,
+        "SLEEP_SNORE_COUNT": 0,
+    }
+
+    # Still in bed, no duration yet
+    values = trend_values(NightReport.from_getday(FIRST_DAY, {"go_to_bed_time": 1000}))
+    assert list(values) == list(TREND_METRICS)
+    assert values["SLEEP_DURATION_HR"] is None
+
+
+def test_on_change_only_for_new_values() -> None:
+    changes = []
+    trends = NightlyTrends(METRICS, on_change=lambda: changes.append(True))
+
+    trends.add_night(FIRST_DAY, {"score": 80})
+    trends.add_night(FIRST_DAY, {"score": 80, "unknown": 1})
+    trends.add_night(FIRST_DAY - datetime.timedelta(days=1), {"score": 90})
+    assert len(changes) == 1
+    trends.add_night(FIRST_DAY, {"score": 81})
+    assert len(changes) == 2
+    assert trends.stat("score", 7).mean == 81
+
+
+def test_empty() -> None:
+    trends = NightlyTrends(METRICS)
+    trends.load(None)
+
+    assert trends.stat("score", 30).count == 0
+    assert trends.stat("score", 30).std_dev is None
+    assert trends.as_dict() == {"nights": []}
+
+
+def test_rolling_stat_add_remove() -> None:
+    stat = RollingStat()
+    for value in (2, 4, 4, 4, 5, 5, 7, 9):
+        stat.add(value)
+    assert stat.mean == 5
+    assert stat.std_dev == 2
+
+    for value in (9, 2, 7):
+        stat.remove(value)
+    assert stat.mean == pytest.approx(statistics.fmean([4, 4, 4, 5, 5]))
+    assert stat.std_dev == pytest.approx(statistics.pstdev([4, 4, 4, 5, 5]))
+
+    for value in (4, 4, 4, 5):
+        stat.remove(value)
+    # A single value has no spread left, whatever the rounding of the removals
+    assert stat.mean == 5
+    assert stat.std_dev == 0
+    stat.remove(5)
+    assert stat.count == 0 and stat.std_dev is None
@@ -1,8 +1,10 @@
 """The YUDEE Pillow integration."""
 from __future__ import annotations
-from datetime import datetime, time, timedelta
+import asyncio
+from datetime import datetime, timedelta
 
 import logging
+import time
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers.update_coordinator import (
@@ -10,26 +12,80 @@ from homeassistant.helpers.update_coordinator import (
     UpdateFailed,
 )
 from homeassistant.helpers import aiohttp_client
+from homeassistant.helpers.storage import Store
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from .smart_pillow.pillow_api import PillowCloudAPI
+from .smart_pillow.fleet import FleetScheduler
+from .smart_pillow.poll_schedule import AdaptivePollSchedule
+from .smart_pillow.report_cache import ReportCache, is_report_final
+from .smart_pillow.resilience import CircuitBreaker, CircuitOpenError
+from .smart_pillow.timing import PHASE_CACHED_REFRESH, PHASE_DISPATCH, PHASE_REFRESH, PHASE_TOKEN
+from .smart_pillow.trends import TREND_METRICS, NightlyTrends, trend_values
+from .report_jobs import ReportFetchJobs
+from .services import async_setup_services
+from .token_manager import TokenManager
 from aiohttp import web
 import async_timeout
 
 
 
 
-from .const import COORDINATORS, DATA_UPDATED, DOMAIN
+from .const import (
+    CIRCUIT_BREAKER,
+    COORDINATORS,
+    DATA_UPDATED,
+    DOMAIN,
+    FETCH_JOBS,
+    FLEET,
+    REPORT_CACHE,
+    REPORT_CACHE_SAVE_DELAY,
+    REPORT_CACHE_STORAGE_KEY,
+    REPORT_CACHE_STORAGE_VERSION,
+    TOKEN_MANAGER,
+    TRENDS_SAVE_DELAY,
+    TRENDS_STORAGE_KEY,
+    TRENDS_STORAGE_VERSION,
+)
 
 PLATFORMS: list[Platform] = [ Platform.SENSOR, Platform.BUTTON]
 
 _LOGGER = logging.getLogger(__name__)
 
+# First poll after setup, later polls follow the sleep cycle
+STARTUP_POLL_DELAY = timedelta(minutes=1)
+
+# Refresh requests this soon after a successful refresh are dropped
+REFRESH_DEBOUNCE = timedelta(seconds=30)
+
+# Deadline of a whole refresh, retries included, so a slow cloud cannot hold a fleet slot for long
+REFRESH_TIMEOUT = 30
+
+REFRESH_STARTED = "started"
+REFRESH_JOINED = "joined"
+REFRESH_DEBOUNCED = "debounced"
+
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the component."""
-    hass.data[DOMAIN] = {}
+    # A config flow may have stored the fleet already, see provisioning
+    hass.data.setdefault(DOMAIN, {}).update({COORDINATORS: {}})
+
+    store = Store(hass, REPORT_CACHE_STORAGE_VERSION, REPORT_CACHE_STORAGE_KEY)
+    report_cache = ReportCache(
+        on_change=lambda: store.async_delay_save(report_cache.as_dict, REPORT_CACHE_SAVE_DELAY),
+        devices=len(hass.config_entries.async_entries(DOMAIN)),
+    )
+    report_cache.load(await store.async_load())
+    hass.data[DOMAIN][REPORT_CACHE] = report_cache
+    hass.data[DOMAIN][TOKEN_MANAGER] = TokenManager(hass)
+    # All pillows talk to the same cloud host, so they share its health
+    hass.data[DOMAIN][CIRCUIT_BREAKER] = CircuitBreaker()
+    hass.data[DOMAIN].setdefault(FLEET, FleetScheduler())
+    hass.data[DOMAIN][FETCH_JOBS] = ReportFetchJobs(hass)
+
+    async_setup_services(hass)
 
     if DOMAIN not in config:
         return True
@@ -43,18 +99,41 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     cnameType = entry.data.get("cnameType")
     sort = entry.data.get("sort")
 
-    _LOGGER.debug(f"data = {mac} {uid} {cname} {cnameType} {sort}")
+    _LOGGER.debug("data = %s %s %s %s %s", mac, uid, cname, cnameType, sort)
     # assert address is not None
 
     session = aiohttp_client.async_get_clientsession(hass)
 
-    pillow_api = PillowCloudAPI(session, cname, cnameType, uid, mac, sort)
-    coordinator = SmartPillowAPICoordinator(hass, entry, pillow_api)
-    hass.data[DOMAIN].setdefault(COORDINATORS, [])
-    hass.data[DOMAIN][COORDINATORS].append(coordinator)
-
-    # await coordinator.async_config_entry_first_refresh()
-    hass.config_entries.async_setup_platforms(entry, PLATFORMS)
+    pillow_api = PillowCloudAPI(
+        session,
+        cname,
+        cnameType,
+        uid,
+        mac,
+        sort,
+        report_cache=hass.data[DOMAIN][REPORT_CACHE],
+        circuit_breaker=hass.data[DOMAIN][CIRCUIT_BREAKER],
+        fleet=hass.data[DOMAIN][FLEET],
+    )
+    trends_store = Store(hass, TRENDS_STORAGE_VERSION, TRENDS_STORAGE_KEY.format(entry.entry_id))
+    trends = NightlyTrends(
+        TREND_METRICS,
+        on_change=lambda: trends_store.async_delay_save(trends.as_dict, TRENDS_SAVE_DELAY),
+    )
+    trends.load(await trends_store.async_load())
+
+    coordinator = SmartPillowAPICoordinator(
+        hass, entry, pillow_api, hass.data[DOMAIN][TOKEN_MANAGER], hass.data[DOMAIN][FLEET], trends
+    )
+    # Entries added after startup grow the cache too
+    hass.data[DOMAIN][REPORT_CACHE].set_devices(len(hass.config_entries.async_entries(DOMAIN)))
+    for report in hass.data[DOMAIN][REPORT_CACHE].reports(pillow_api.did):
+        coordinator.poll_schedule.learn(report.day, report.wake_up_time)
+    hass.data[DOMAIN][COORDINATORS][entry.entry_id] = coordinator
+
+    # Entities listen through the dispatcher, this listener keeps scheduled polls running
+    entry.async_on_unload(coordinator.async_add_listener(lambda: None))
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
 
     return True
@@ -63,70 +142,138 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        hass.data[DOMAIN][TOKEN_MANAGER].async_remove_entry(entry)
+        hass.data[DOMAIN][FETCH_JOBS].async_cancel(entry_id=entry.entry_id)
+        hass.data[DOMAIN][COORDINATORS].pop(entry.entry_id)
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored trends of a deleted entry and shrink the report cache to the remaining ones."""
+    if REPORT_CACHE in hass.data.get(DOMAIN, {}):
+        remaining = [other for other in hass.config_entries.async_entries(DOMAIN) if other.entry_id != entry.entry_id]
+        hass.data[DOMAIN][REPORT_CACHE].set_devices(len(remaining))
+    await Store(hass, TRENDS_STORAGE_VERSION, TRENDS_STORAGE_KEY.format(entry.entry_id)).async_remove()
+
+
 class SmartPillowAPICoordinator(DataUpdateCoordinator):
     """My custom coordinator."""
 
-    def __init__(self, hass, entry:ConfigEntry, pillow_api:PillowCloudAPI):
+    def __init__(self, hass, entry:ConfigEntry, pillow_api:PillowCloudAPI, token_manager:TokenManager, fleet:FleetScheduler, trends:NightlyTrends | None = None):
         """Initialize my coordinator."""
         super().__init__(
             hass,
             _LOGGER,
-            name="Smart Pillow Coordinator"
+            name="Smart Pillow Coordinator",
+            update_interval=fleet.stagger(pillow_api.did, datetime.now(), STARTUP_POLL_DELAY),
         )
         self.pillow_api = pillow_api
         self._entry = entry
-
-    
-    async def check_token(self):
-        
-        if (self._entry.data.get("token") is not None and  datetime.fromtimestamp(self._entry.data.get("expiration")) > datetime.now() ):
-            token = self._entry.data.get("token")
-            _LOGGER.debug(f"Token is {token}")
-            return True
-        
-        else:
-            return False
-
+        self._token_manager = token_manager
+        self._fleet = fleet
+        self._report_fingerprint: str | None = None
+        self.poll_schedule = AdaptivePollSchedule()
+        self.trends = trends if trends is not None else NightlyTrends(TREND_METRICS)
+        self._refresh_in_flight: asyncio.Future | None = None
+        self._last_refresh_success: float | None = None
+        self._refresh_from_cache = False
+
+    @property
+    def entry(self) -> ConfigEntry:
+        return self._entry
+
+    async def async_ensure_token(self) -> str:
+        """Make sure the API holds a valid token, for calls outside of refreshes."""
+        token = await self._token_manager.async_get_token(self._entry, self.pillow_api)
+        self.pillow_api.set_token(token)
+        return token
+
+    async def async_request_coalesced_refresh(self) -> str:
+        """Refresh unless a refresh is in flight or just succeeded.
+
+        Joins a refresh already in flight, scheduled or requested, and drops
+        requests within REFRESH_DEBOUNCE of the last successful one. Returns
+        REFRESH_STARTED, REFRESH_JOINED or REFRESH_DEBOUNCED.
+        """
+        if (in_flight := self._refresh_in_flight) is not None:
+            await asyncio.shield(in_flight)
+            return REFRESH_JOINED
+        if (
+            self._last_refresh_success is not None
+            and time.monotonic() - self._last_refresh_success < REFRESH_DEBOUNCE.total_seconds()
+        ):
+            return REFRESH_DEBOUNCED
+        await self.async_refresh()
+        return REFRESH_STARTED
+
+    def _schedule_next_poll(self) -> None:
+        now = datetime.now()
+        report = self.pillow_api.day_report
+        last_night_final = (
+            report is not None
+            and report.day == (now - timedelta(days=1)).date()
+            and is_report_final(report.day, report.wake_up_time, now.timestamp())
+        )
+        if last_night_final:
+            self.poll_schedule.learn(report.day, report.wake_up_time)
+        self.update_interval = self._fleet.stagger(
+            self.pillow_api.did, now, self.poll_schedule.next_interval(now, last_night_final)
+        )
+        _LOGGER.debug("Next poll for %s in %s", self.pillow_api.did, self.update_interval)
+
+    async def _async_fetch_report(self, token: str):
+        # Timeouts and retries are applied per request by the API
+        self.pillow_api.set_token(token)
+        report = await self.pillow_api.fetch_last_night_report()
+        self._refresh_from_cache = self.pillow_api.day_report_from_cache
+
+        # The cloud mostly returns the same report during the day, only notify on change
+        if report.fingerprint == self._report_fingerprint:
+            _LOGGER.debug("Report for %s unchanged", self.pillow_api.did)
+            return
+        self._report_fingerprint = report.fingerprint
+        values = trend_values(report)
+        if any(value is not None for value in values.values()):
+            self.trends.add_night(report.day, values)
+        # Sensor updates are callbacks, their state writes happen inside the send
+        with self.pillow_api.timings.span(PHASE_DISPATCH):
+            async_dispatcher_send(self.hass, DATA_UPDATED.format(self.pillow_api.did))
 
     async def _async_update_data(self):
-        token_may_expired = False
-
-
-        if await self.check_token():
+        # Set before the first await, refresh requests arriving from now on join this one
+        self._refresh_in_flight = self.hass.loop.create_future()
+        self._refresh_from_cache = False
+        start = time.perf_counter()
+        try:
             try:
-
-                async with async_timeout.timeout(10):
-                    self.pillow_api.set_token(self._entry.data.get("token") )
-                    await self.pillow_api.fetch_last_night_report()
-                    async_dispatcher_send(self.hass, DATA_UPDATED)
-
-                    # self.async_update_listeners()
-            except web.HTTPUnauthorized:
-                token_may_expired = True
-
-        if not await self.check_token() or token_may_expired:
-            token = await self.pillow_api.get_token()
-            expiration = datetime.timestamp( datetime.now() + timedelta(days=15))
-            entry_data = self._entry.data.copy()
-            entry_data["token"] = token
-            entry_data["expiration"] = expiration
-
-            self.hass.config_entries.async_update_entry(self._entry, data=entry_data)
-
-            #Try get data again
+                async with async_timeout.timeout(REFRESH_TIMEOUT):
+                    await self._async_update_report()
+            except asyncio.TimeoutError as err:
+                raise UpdateFailed(f"Refresh did not finish within {REFRESH_TIMEOUT}s") from err
+            self._last_refresh_success = time.monotonic()
+        finally:
+            self.pillow_api.timings.record(
+                PHASE_CACHED_REFRESH if self._refresh_from_cache else PHASE_REFRESH, time.perf_counter() - start
+            )
+            self._refresh_in_flight.set_result(None)
+            self._refresh_in_flight = None
+            self._schedule_next_poll()
+
+    async def _async_update_report(self):
+        timings = self.pillow_api.timings
+        try:
+            with timings.span(PHASE_TOKEN):
+                token = await self._token_manager.async_get_token(self._entry, self.pillow_api)
             try:
-
-                async with async_timeout.timeout(10):
-                    self.pillow_api.set_token(self._entry.data.get("token") )
-                    await self.pillow_api.fetch_last_night_report()
-                    async_dispatcher_send(self.hass, DATA_UPDATED)
-
-                # self.async_update_listeners()
+                await self._async_fetch_report(token)
             except web.HTTPUnauthorized:
-                token_may_expired = True
-                raise UpdateFailed(f"Error communicating with API")
\ No newline at end of file
+                # Token may have expired early, log in again and retry once
+                self._token_manager.async_invalidate(self._entry, token)
+                with timings.span(PHASE_TOKEN):
+                    token = await self._token_manager.async_refresh_token(self._entry, self.pillow_api)
+                await self._async_fetch_report(token)
+        except web.HTTPUnauthorized as err:
+            raise UpdateFailed(f"Error communicating with API") from err
+        except CircuitOpenError as err:
+            raise UpdateFailed(f"Cloud unavailable: {err}") from err
@@ -3,10 +3,8 @@ import asyncio
 from dataclasses import dataclass
 import logging
 from asyncio import sleep
-from typing import Callable
-from . import SmartPillowAPICoordinator
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
 from .entity_description import SmartPillowEntityDescription
-from .smart_pillow.pillow_api import PillowCloudAPI
 
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import DeviceInfo
@@ -17,13 +15,16 @@ from .const import  COORDINATORS, DOMAIN
 from homeassistant.components.button import ButtonEntity, ButtonEntityDescription
 
 
+if TYPE_CHECKING:
+    from . import SmartPillowAPICoordinator
+
 _LOGGER = logging.getLogger(__name__)
 
 @dataclass
 class SmartPillowRequiredKeysMixin:
     """Mixin for required keys."""
 
-    run_func: Callable[[PillowCloudAPI], None]
+    run_func: Callable[[SmartPillowAPICoordinator], Awaitable[str]]
 
 
 @dataclass
@@ -35,7 +36,7 @@ BUTTON_TYPE_UPDATE_LAST_NIGHT = SmartPillowEntityDescription(
     name="Get last night report",
     icon="mdi:chart-areaspline",
     # device_class=ButtonDeviceClass.SWITCH,
-    run_func=lambda api: api.fetch_last_night_report(),
+    run_func=lambda coordinator: coordinator.async_request_coalesced_refresh(),
 )
 
 
@@ -43,14 +44,9 @@ BUTTON_TYPE_UPDATE_LAST_NIGHT = SmartPillowEntityDescription(
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
-    
-    entities = []
-    for coordinator in hass.data[DOMAIN][COORDINATORS]:
-
-        entities.append(SmartPillowSensorAdapter(coordinator, BUTTON_TYPE_UPDATE_LAST_NIGHT))
-
 
-    async_add_entities(entities)
+    coordinator = hass.data[DOMAIN][COORDINATORS][entry.entry_id]
+    async_add_entities([SmartPillowSensorAdapter(coordinator, BUTTON_TYPE_UPDATE_LAST_NIGHT)])
     _LOGGER.debug("Button setup entry")
 
 class SmartPillowSensorAdapter(ButtonEntity):
@@ -73,13 +69,18 @@ class SmartPillowSensorAdapter(ButtonEntity):
         self._api = coordinator.pillow_api
         self._coordinator = coordinator
         self.entity_description = description
+        self._last_refresh: str | None = None
 
 
     async def async_press(self) -> None:
-        # await self.entity_description.run_func(self._api)
-        await self._coordinator.async_refresh()
-        self.async_schedule_update_ha_state(True)
-        # await self._coordinator.async_config_entry_first_refresh()
+        self._last_refresh = await self.entity_description.run_func(self._coordinator)
+        _LOGGER.debug("Refresh of %s %s", self._api.did, self._last_refresh)
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        # started, joined or debounced
+        return {"last_refresh": self._last_refresh}
 
     def available(self) -> bool:
         return self._api.day_report is None
@@ -19,12 +19,15 @@ from homeassistant.components.bluetooth import (
     BluetoothServiceInfo,
     BluetoothManager
 )
-from homeassistant.config_entries import ConfigFlow
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigFlow
 from homeassistant.const import CONF_ADDRESS
+from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers import selector
                 
 
-from .const import DOMAIN, DATA_MANAGER
+from .const import ADAPTER_UID, DOMAIN, DATA_MANAGER
+from .provisioning import async_validate_devices, format_mac, is_valid_mac, normalize_mac, parse_devices
 
 
 
@@ -59,6 +62,26 @@ class Discovery:
     # return device.title or device.get_device_name() or discovery_info.name
 
 
+async def _async_default_uid(hass: HomeAssistant) -> str:
+    """Return the uid derived from the first bluetooth adapter."""
+    if (uid := hass.data.get(ADAPTER_UID)) is not None:
+        return uid
+
+    manager: BluetoothManager = hass.data[DATA_MANAGER]
+    adapters = await manager.async_get_bluetooth_adapters()
+    uid = secrets.token_hex(32)
+    if (adapters):
+        mac = list(adapters.values())[0]["address"].replace(":","").lower()
+        if mac != "000000000000":
+            uid = mac
+    hass.data[ADAPTER_UID] = uid
+    return uid
+
+
+def _entry_title(mac: str) -> str:
+    return "Smart Pillow - " + mac.replace(":","")[4:]
+
+
 class YUDEEPillowConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for YUDEE Pillow Bluetooth."""
 
@@ -76,7 +99,7 @@ class YUDEEPillowConfigFlow(ConfigFlow, domain=DOMAIN):
         self, discovery_info: BluetoothServiceInfo
     ) -> FlowResult:
         """Handle the bluetooth discovery step."""
-        await self.async_set_unique_id(discovery_info.address)
+        await self.async_set_unique_id(normalize_mac(discovery_info.address))
         # self._abort_if_unique_id_configured()
         # device = DeviceData()
         # if not device.supported(discovery_info):
@@ -103,13 +126,7 @@ class YUDEEPillowConfigFlow(ConfigFlow, domain=DOMAIN):
             if (len(mac) != 17):
                 mac = ""
 
-            manager: BluetoothManager = self.hass.data[DATA_MANAGER]
-            adapters = await manager.async_get_bluetooth_adapters()
-            uid = secrets.token_hex(32)
-            if (adapters):  
-                mac = list(adapters.values())[0]["address"].replace(":","").lower()
-                if mac != "000000000000":
-                    uid = mac
+            uid = await _async_default_uid(self.hass)
 
 
             if DEBUG_ENV:
@@ -125,7 +142,7 @@ class YUDEEPillowConfigFlow(ConfigFlow, domain=DOMAIN):
                     vol.Required("mac", default=mac):str,
                     vol.Required("cname"): str,
                     vol.Required("cnameType"): str,
-                    vol.Required("uid"): str,
+                    vol.Required("uid", default=uid): str,
                     vol.Required("sort"): str,
                 }
 
@@ -140,25 +157,33 @@ class YUDEEPillowConfigFlow(ConfigFlow, domain=DOMAIN):
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
+        # The bluetooth confirm form submits here
+        if user_input is not None:
+            return await self.async_step_manual(user_input)
 
+        return self.async_show_menu(step_id="user", menu_options=["manual", "bulk"])
 
-        manager: BluetoothManager = self.hass.data[DATA_MANAGER]
-        adapters = await manager.async_get_bluetooth_adapters()
-        
-        uid = secrets.token_hex(32)
-        if (adapters):  
-            mac = list(adapters.values())[0]["address"].replace(":","").lower()
-            if mac != "000000000000":
-                uid = mac
+    async def async_step_manual(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+
+        uid = await _async_default_uid(self.hass)
+        errors: dict[str, str] = {}
     
         if user_input is not None:
             _LOGGER.debug(user_input)
-            await self.async_set_unique_id(user_input["mac"])
-            self._abort_if_unique_id_configured()
-            return self.async_create_entry(
-            title="Smart Pillow - " + user_input["mac"].replace(":","")[4:],
-                data=user_input,
-            )
+            device = {**user_input, "mac": format_mac(user_input["mac"])}
+            if not is_valid_mac(device["mac"]):
+                errors["mac"] = "invalid_mac"
+            else:
+                await self.async_set_unique_id(normalize_mac(device["mac"]))
+                self._abort_if_unique_id_configured()
+                if not (failed := await async_validate_devices(self.hass, [device])):
+                    return self.async_create_entry(
+                    title=_entry_title(device["mac"]),
+                        data=device,
+                    )
+                errors["base"] = failed[device["mac"]]
         
         if DEBUG_ENV:
             data_schema = {
@@ -173,9 +198,68 @@ class YUDEEPillowConfigFlow(ConfigFlow, domain=DOMAIN):
                 vol.Required("mac"): str,
                 vol.Required("cname"): str,
                 vol.Required("cnameType"): str,
-                vol.Required("uid"): str,
+                vol.Required("uid", default=uid): str,
                 vol.Required("sort"): str,
             }
 
 
-        return self.async_show_form(step_id="user", data_schema=vol.Schema(data_schema))
+        return self.async_show_form(step_id="manual", data_schema=vol.Schema(data_schema), errors=errors)
+
+    async def async_step_bulk(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Add every pillow of a YAML or CSV list, validating them concurrently."""
+        errors: dict[str, str] = {}
+        failed_devices = ""
+
+        if user_input is not None:
+            try:
+                devices = parse_devices(user_input["devices"], await _async_default_uid(self.hass))
+            except vol.Invalid as err:
+                errors["base"] = "invalid_device_list"
+                failed_devices = str(err)
+            else:
+                configured = self._async_current_ids()
+                devices = [device for device in devices if normalize_mac(device["mac"]) not in configured]
+                if not devices:
+                    return self.async_abort(reason="already_configured")
+                failed = await async_validate_devices(self.hass, devices)
+                if failed and not user_input.get("skip_invalid"):
+                    errors["base"] = "devices_failed"
+                    failed_devices = ", ".join(f"{mac} ({error})" for mac, error in failed.items())
+                else:
+                    valid = [device for device in devices if device["mac"] not in failed]
+                    if not valid:
+                        return self.async_abort(reason="no_devices_found")
+                    # One import flow per pillow creates the entries
+                    await asyncio.gather(
+                        *(
+                            self.hass.config_entries.flow.async_init(
+                                DOMAIN, context={"source": SOURCE_IMPORT}, data=device
+                            )
+                            for device in valid
+                        )
+                    )
+                    return self.async_abort(
+                        reason="bulk_imported", description_placeholders={"count": str(len(valid))}
+                    )
+
+        data_schema = {
+            vol.Required(
+                "devices", default=(user_input or {}).get("devices", "")
+            ): selector.TextSelector(selector.TextSelectorConfig(multiline=True)),
+            vol.Optional("skip_invalid", default=False): bool,
+        }
+        return self.async_show_form(
+            step_id="bulk",
+            data_schema=vol.Schema(data_schema),
+            errors=errors,
+            description_placeholders={"failed": failed_devices},
+        )
+
+    async def async_step_import(self, import_data: dict[str, Any]) -> FlowResult:
+        """Create the entry of a pillow validated by the bulk step."""
+        import_data = {**import_data, "mac": format_mac(import_data["mac"])}
+        await self.async_set_unique_id(normalize_mac(import_data["mac"]))
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(title=_entry_title(import_data["mac"]), data=import_data)
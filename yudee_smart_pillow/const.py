@@ -3,5 +3,21 @@ from typing import TYPE_CHECKING, Final
 
 DOMAIN = "yudee_smart_pillow"
 COORDINATORS = "coordinators"
-DATA_UPDATED = "yudee_data_updated"
+# Per device signal, format with the device did
+DATA_UPDATED = "yudee_data_updated_{}"
+EVENT_FETCH_PROGRESS = f"{DOMAIN}_fetch_progress"
+EVENT_FETCH_REPORT = f"{DOMAIN}_fetch_report"
 DATA_MANAGER: Final = "bluetooth_manager"
+# Default uid derived from the bluetooth adapter, looked up once
+ADAPTER_UID = f"{DOMAIN}_adapter_uid"
+TOKEN_MANAGER = "token_manager"
+CIRCUIT_BREAKER = "circuit_breaker"
+FLEET = "fleet"
+FETCH_JOBS = "fetch_jobs"
+REPORT_CACHE = "report_cache"
+REPORT_CACHE_STORAGE_KEY = f"{DOMAIN}.report_cache"
+REPORT_CACHE_STORAGE_VERSION = 1
+REPORT_CACHE_SAVE_DELAY = 60
+TRENDS_STORAGE_KEY = f"{DOMAIN}.trends_{{}}"
+TRENDS_STORAGE_VERSION = 1
+TRENDS_SAVE_DELAY = 60
@@ -0,0 +1,37 @@
+"""Diagnostics support for the YUDEE Pillow integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CIRCUIT_BREAKER, COORDINATORS, DOMAIN, FLEET, REPORT_CACHE
+
+# Credentials, and the mac they are derived from
+TO_REDACT = {"mac", "cname", "uid", "sort", "token", "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data = hass.data[DOMAIN]
+    coordinator = data[COORDINATORS][entry.entry_id]
+    report = coordinator.pillow_api.day_report
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": None
+            if coordinator.update_interval is None
+            else coordinator.update_interval.total_seconds(),
+            "report_day": None if report is None else report.day.isoformat(),
+        },
+        # Milliseconds per refresh phase, over the last refreshes of this device
+        "timings": coordinator.pillow_api.timings.as_dict(),
+        "circuit_breaker": data[CIRCUIT_BREAKER].as_dict(),
+        "fleet": data[FLEET].as_dict(),
+        "report_cache_nights": len(data[REPORT_CACHE]),
+        "trends": coordinator.trends.as_dict(),
+    }
@@ -2,12 +2,14 @@ from dataclasses import dataclass
 from typing import Callable
 from homeassistant.components.sensor import SensorEntityDescription
 
+from .smart_pillow.report import NightReport
+
 
 @dataclass
 class SmartPillowRequiredKeysMixin:
     """Mixin for required keys."""
 
-    value_func: Callable[[dict], float | None]
+    value_func: Callable[[NightReport], float | None]
 
 
 @dataclass
@@ -0,0 +1,124 @@
+"""Backfill of nightly reports into recorder long-term statistics."""
+from __future__ import annotations
+
+from datetime import date
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .sensor import SUPPORTED_SENSORS, SmartPillowEntityDescription
+from .smart_pillow.pillow_api import DEFAULT_RANGE_CONCURRENCY
+from .smart_pillow.report import NightReport
+
+if TYPE_CHECKING:
+    from . import SmartPillowAPICoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Nights collected before handing a batch to the recorder
+BACKFILL_BATCH_SIZE = 50
+
+STATISTIC_SENSORS = [
+    sensor for sensor in SUPPORTED_SENSORS if sensor.state_class == SensorStateClass.MEASUREMENT
+]
+
+
+def statistic_id(did: str, description: SmartPillowEntityDescription) -> str:
+    """Return the external statistic id of a sensor of a device."""
+    return f"{DOMAIN}:{did}_{description.key}".lower()
+
+
+def _statistic_metadata(
+    coordinator: SmartPillowAPICoordinator, description: SmartPillowEntityDescription
+) -> StatisticMetaData:
+    return StatisticMetaData(
+        has_mean=True,
+        has_sum=False,
+        name=f"{coordinator.entry.title} {description.name}",
+        source=DOMAIN,
+        statistic_id=statistic_id(coordinator.pillow_api.did, description),
+        unit_of_measurement=description.native_unit_of_measurement,
+    )
+
+
+def _night_statistics(report: NightReport) -> dict[str, StatisticData]:
+    """Return one statistic row per sensor, stamped at the hour of wake up."""
+    if not report.wake_up_time:
+        return {}
+    start = dt_util.utc_from_timestamp(report.wake_up_time).replace(minute=0, second=0, microsecond=0)
+
+    rows = {}
+    for description in STATISTIC_SENSORS:
+        try:
+            value = description.value_func(report)
+        except (TypeError, ValueError):
+            continue
+        if value is None:
+            continue
+        rows[description.key] = StatisticData(start=start, mean=value, min=value, max=value)
+    return rows
+
+
+async def async_backfill_statistics(
+    hass: HomeAssistant,
+    coordinator: SmartPillowAPICoordinator,
+    start: date,
+    end: date,
+    max_concurrency: int = DEFAULT_RANGE_CONCURRENCY,
+) -> int:
+    """Import the reports from start to end as external statistics.
+
+    Nights that fail to fetch are logged and skipped, the rest is imported.
+    Returns the number of nights imported.
+    """
+    await coordinator.async_ensure_token()
+    metadata = {
+        description.key: _statistic_metadata(coordinator, description)
+        for description in STATISTIC_SENSORS
+    }
+    pending: dict[str, list[StatisticData]] = {key: [] for key in metadata}
+    pending_nights = 0
+    imported = 0
+    failed: list[date] = []
+
+    def flush() -> None:
+        for key, rows in pending.items():
+            if rows:
+                async_add_external_statistics(hass, metadata[key], sorted(rows, key=lambda row: row["start"]))
+                rows.clear()
+
+    async for day, report in coordinator.pillow_api.fetch_report_range(
+        start, end, max_concurrency, return_exceptions=True
+    ):
+        if isinstance(report, Exception):
+            _LOGGER.debug("Skipping statistics of %s for %s: %r", day, coordinator.pillow_api.did, report)
+            failed.append(day)
+            continue
+        rows = _night_statistics(report)
+        if not rows:
+            continue
+        for key, row in rows.items():
+            pending[key].append(row)
+        pending_nights += 1
+        imported += 1
+        if pending_nights >= BACKFILL_BATCH_SIZE:
+            flush()
+            pending_nights = 0
+
+    flush()
+    if failed:
+        _LOGGER.warning(
+            "Could not fetch %d nights of %s, first %s, imported the other %d",
+            len(failed),
+            coordinator.pillow_api.did,
+            min(failed),
+            imported,
+        )
+    _LOGGER.debug("Imported %d nights of statistics for %s", imported, coordinator.pillow_api.did)
+    return imported
@@ -0,0 +1,158 @@
+"""Parsing and credential validation of pillows added from a list."""
+from __future__ import annotations
+
+import asyncio
+import csv
+from datetime import datetime
+import io
+import logging
+import re
+from typing import Any
+
+from aiohttp import ClientError, web
+import voluptuous as vol
+import yaml
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import aiohttp_client
+
+from .const import DOMAIN, FLEET
+from .smart_pillow.fleet import FleetScheduler
+from .smart_pillow.pillow_api import PillowCloudAPI
+from .smart_pillow.resilience import CircuitBreaker, CircuitOpenError
+from .token_manager import TOKEN_LIFETIME
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_FIELDS = ("mac", "cname", "cnameType", "uid", "sort")
+
+ERROR_INVALID_AUTH = "invalid_auth"
+ERROR_CANNOT_CONNECT = "cannot_connect"
+ERROR_TIMEOUT = "timeout_connect"
+
+MAC_PATTERN = r"^([0-9A-F]{2}:){5}[0-9A-F]{2}$"
+
+
+def format_mac(mac: str) -> str:
+    """Return mac with colons between its bytes, in the case it was entered.
+
+    The cloud did is derived from the stored mac, so its case is kept.
+    Accepts colons, dashes or no separators at all.
+    """
+    mac = mac.strip().replace("-", ":")
+    if len(mac) == 12 and ":" not in mac:
+        return ":".join(mac[index : index + 2] for index in range(0, 12, 2))
+    return mac
+
+
+def normalize_mac(mac: str) -> str:
+    """Return mac the way unique ids and duplicate checks compare it."""
+    return format_mac(mac).upper()
+
+
+def is_valid_mac(mac: str) -> bool:
+    return re.match(MAC_PATTERN, normalize_mac(mac)) is not None
+
+
+def _mac(value: Any) -> str:
+    if not isinstance(value, str):
+        # YAML reads unquoted macs made of digits only as numbers
+        raise vol.Invalid("invalid mac, quote it in YAML")
+    if not is_valid_mac(value):
+        raise vol.Invalid("invalid mac")
+    return format_mac(value)
+
+
+DEVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required("mac"): _mac,
+        vol.Required("cname"): vol.All(vol.Coerce(str), vol.Strip),
+        vol.Required("cnameType"): vol.All(vol.Coerce(str), vol.Strip),
+        vol.Optional("uid"): vol.All(vol.Coerce(str), vol.Strip),
+        vol.Required("sort"): vol.All(vol.Coerce(str), vol.Strip),
+    }
+)
+
+
+def parse_devices(text: str, default_uid: str) -> list[dict[str, Any]]:
+    """Parse a YAML list of devices or CSV rows of mac,cname,cnameType,uid,sort.
+
+    CSV may start with a header row naming the columns, otherwise the
+    columns are taken in DEVICE_FIELDS order. An empty uid falls back to
+    default_uid. Raises vol.Invalid naming the first bad device.
+    """
+    try:
+        loaded = yaml.safe_load(text)
+    except yaml.YAMLError:
+        loaded = None
+
+    if isinstance(loaded, list) and all(isinstance(row, dict) for row in loaded):
+        rows = loaded
+    else:
+        lines = [line for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+        reader = csv.reader(io.StringIO("\n".join(lines)), skipinitialspace=True)
+        records = list(reader)
+        header = DEVICE_FIELDS
+        if records and "mac" in (column.strip() for column in records[0]):
+            header = tuple(column.strip() for column in records.pop(0))
+        rows = [dict(zip(header, record)) for record in records]
+
+    devices = []
+    seen = set()
+    for index, row in enumerate(rows, 1):
+        if not row.get("uid"):
+            row = {**row, "uid": default_uid}
+        try:
+            device = DEVICE_SCHEMA({field: row[field] for field in DEVICE_FIELDS if field in row})
+        except vol.Invalid as err:
+            raise vol.Invalid(f"device {index}: {err}") from err
+        if (mac := normalize_mac(device["mac"])) in seen:
+            raise vol.Invalid(f"device {index}: duplicate mac {device['mac']}")
+        seen.add(mac)
+        devices.append(device)
+    return devices
+
+
+async def async_validate_devices(hass: HomeAssistant, devices: list[dict[str, Any]]) -> dict[str, str]:
+    """Log in with every device concurrently.
+
+    The logins share the fleet cap on cloud requests in flight with the
+    running pillows, each one bounded by the per request timeouts and retries.
+    Returns the errors by mac. Devices that logged in get their token and
+    expiration added, so their first poll does not log in again.
+    """
+    session = aiohttp_client.async_get_clientsession(hass)
+    # Flows can run before the integration is set up, which then keeps this fleet
+    fleet = hass.data.setdefault(DOMAIN, {}).setdefault(FLEET, FleetScheduler())
+    # Failed logins of a bad list must not open the circuit of the running pillows
+    breaker = CircuitBreaker()
+    errors: dict[str, str] = {}
+
+    async def validate(device: dict[str, Any]) -> None:
+        api = PillowCloudAPI(
+            session,
+            device["cname"],
+            device["cnameType"],
+            device["uid"],
+            device["mac"],
+            device["sort"],
+            circuit_breaker=breaker,
+            fleet=fleet,
+        )
+        try:
+            token = await api.get_token()
+        except web.HTTPUnauthorized:
+            errors[device["mac"]] = ERROR_INVALID_AUTH
+            return
+        except asyncio.TimeoutError:
+            errors[device["mac"]] = ERROR_TIMEOUT
+            return
+        except (ClientError, CircuitOpenError) as err:
+            _LOGGER.debug("Validating %s failed: %r", device["mac"], err)
+            errors[device["mac"]] = ERROR_CANNOT_CONNECT
+            return
+        device["token"] = token
+        device["expiration"] = (datetime.now() + TOKEN_LIFETIME).timestamp()
+
+    await asyncio.gather(*(validate(device) for device in devices))
+    return errors
@@ -0,0 +1,128 @@
+"""Background fetches of report ranges started by the fetch_reports service."""
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+import logging
+from typing import TYPE_CHECKING, Any
+import uuid
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import EVENT_FETCH_PROGRESS, EVENT_FETCH_REPORT
+from .smart_pillow.report import NightReport
+
+if TYPE_CHECKING:
+    from . import SmartPillowAPICoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Kept below the fleet wide request cap so scheduled polls still get a slot
+DEFAULT_FETCH_CONCURRENCY = 2
+
+JOB_STARTED = "started"
+JOB_RUNNING = "running"
+JOB_FINISHED = "finished"
+JOB_CANCELLED = "cancelled"
+JOB_FAILED = "failed"
+
+SUMMARY_FIELDS = (
+    "score",
+    "go_to_bed_time",
+    "wake_up_time",
+    "sleep_duration",
+    "awake_percent",
+    "deep_percent",
+    "light_percent",
+    "rem_percent",
+    "heart_beat_avg",
+    "breath_avg",
+    "vibrate_count",
+    "snore_count_total",
+)
+
+
+def _report_summary(report: NightReport) -> dict[str, Any]:
+    return {field: getattr(report, field) for field in SUMMARY_FIELDS}
+
+
+class ReportFetchJobs:
+    """Track fetch_reports jobs so they can be cancelled.
+
+    Every job runs as its own task and reports through events: one
+    EVENT_FETCH_REPORT per night and EVENT_FETCH_PROGRESS after every
+    night and when the job ends. Jobs only read through the report cache
+    and never touch the coordinator, so regular polls keep running.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        # job id -> (config entry id, task)
+        self._jobs: dict[str, tuple[str, asyncio.Task]] = {}
+
+    @callback
+    def async_start(
+        self,
+        coordinator: SmartPillowAPICoordinator,
+        device_id: str,
+        start: date,
+        end: date,
+        max_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    ) -> str:
+        """Start fetching start to end in the background, return the job id."""
+        job_id = uuid.uuid4().hex
+        # Background tasks do not delay startup and are cancelled when Home Assistant stops
+        task = self._hass.async_create_background_task(
+            self._async_run(job_id, coordinator, device_id, start, end, max_concurrency),
+            f"yudee_smart_pillow fetch job {job_id}",
+        )
+        self._jobs[job_id] = (coordinator.entry.entry_id, task)
+        task.add_done_callback(lambda _: self._jobs.pop(job_id, None))
+        return job_id
+
+    @callback
+    def async_cancel(self, job_id: str | None = None, entry_id: str | None = None) -> int:
+        """Cancel the job with job_id or every job of entry_id, return how many."""
+        cancelled = 0
+        for running_id, (running_entry_id, task) in list(self._jobs.items()):
+            if running_id == job_id or running_entry_id == entry_id:
+                task.cancel()
+                cancelled += 1
+        return cancelled
+
+    async def _async_run(
+        self,
+        job_id: str,
+        coordinator: SmartPillowAPICoordinator,
+        device_id: str,
+        start: date,
+        end: date,
+        max_concurrency: int,
+    ) -> None:
+        fire = self._hass.bus.async_fire
+        base = {"job_id": job_id, "device_id": device_id}
+        progress = {"total": (end - start).days + 1, "done": 0, "failed": 0}
+        fire(EVENT_FETCH_PROGRESS, {**base, "status": JOB_STARTED, **progress})
+
+        status = JOB_FINISHED
+        try:
+            await coordinator.async_ensure_token()
+            async for day, report in coordinator.pillow_api.fetch_report_range(
+                start, end, max_concurrency, return_exceptions=True
+            ):
+                progress["done"] += 1
+                if isinstance(report, Exception):
+                    progress["failed"] += 1
+                    fire(EVENT_FETCH_REPORT, {**base, "day": day.isoformat(), "error": repr(report)})
+                else:
+                    fire(EVENT_FETCH_REPORT, {**base, "day": day.isoformat(), **_report_summary(report)})
+                fire(EVENT_FETCH_PROGRESS, {**base, "status": JOB_RUNNING, **progress})
+        except asyncio.CancelledError:
+            status = JOB_CANCELLED
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            status = JOB_FAILED
+            _LOGGER.warning("Fetching reports of %s failed: %r", coordinator.pillow_api.did, err)
+        finally:
+            _LOGGER.debug("Fetch job %s %s: %s", job_id, status, progress)
+            fire(EVENT_FETCH_PROGRESS, {**base, "status": status, **progress})
@@ -3,9 +3,7 @@ from dataclasses import dataclass
 from datetime import datetime
 
 
-from typing import Callable, Optional, Union
-
-from . import SmartPillowAPICoordinator
+from typing import TYPE_CHECKING, Any, Callable, Optional, Union
 
 from homeassistant import config_entries
 from homeassistant.components.bluetooth.passive_update_processor import (
@@ -13,6 +11,7 @@ from homeassistant.components.bluetooth.passive_update_processor import (
     PassiveBluetoothProcessorEntity,
 )
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
     SensorStateClass,
@@ -21,15 +20,24 @@ from homeassistant.const import (
     DEVICE_CLASS_DATE,
     PERCENTAGE,
 )
-from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
-from homeassistant.helpers.entity import DeviceInfo, EntityDescription
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory, EntityDescription
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import COORDINATORS, DATA_UPDATED, DOMAIN
+from .smart_pillow.hypnogram import LARGE_ATTRIBUTES, hypnogram_attributes
+from .smart_pillow.pillow_api import PillowCloudAPI
+from .smart_pillow.report import NightReport
+from .smart_pillow.timing import PHASE_CACHED_REFRESH, PHASE_REFRESH, PHASES
+from .smart_pillow.trends import TREND_METRICS, TREND_WINDOWS, sleep_duration_hours
 from .device import device_key_to_bluetooth_entity_key, sensor_device_info_to_hass
 import logging
 
+if TYPE_CHECKING:
+    from . import SmartPillowAPICoordinator
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -37,13 +45,15 @@ _LOGGER = logging.getLogger(__name__)
 class SmartPillowRequiredKeysMixin:
     """Mixin for required keys."""
 
-    value_func: Callable[[dict], float | None]
+    value_func: Callable[[NightReport], float | None]
 
 
 @dataclass
 class SmartPillowEntityDescription(SensorEntityDescription, SmartPillowRequiredKeysMixin):
     """Describes Smart pillow sensor entity."""
 
+    attributes_func: Callable[[NightReport], dict[str, Any]] | None = None
+
 
 SENSOR_TYPE_SLEEP_SCORE = SmartPillowEntityDescription(
     key="score",
@@ -51,14 +61,14 @@ SENSOR_TYPE_SLEEP_SCORE = SmartPillowEntityDescription(
     icon="mdi:star",
     native_unit_of_measurement=PERCENTAGE,
     state_class=SensorStateClass.MEASUREMENT,
-    value_func=lambda data: data["score"],
+    value_func=lambda report: report.score,
 )
 
 SENSOR_TYPE_GO_TO_BED_TIME = SmartPillowEntityDescription(
     key="go_to_bed_time",
     name="Go to bed time",
     icon="mdi:bed-clock",
-    value_func=lambda data: datetime.fromtimestamp(data["go_to_bed_time"]),
+    value_func=lambda report: datetime.fromtimestamp(report.go_to_bed_time),
 )
 
 SENSOR_TYPE_WAKE_UP_TIME = SmartPillowEntityDescription(
@@ -66,7 +76,7 @@ SENSOR_TYPE_WAKE_UP_TIME = SmartPillowEntityDescription(
     name="Wake up time",
     icon="mdi:bed-clock",
     device_class=DEVICE_CLASS_DATE,
-    value_func=lambda data: datetime.fromtimestamp(data["wake_up_time"]),
+    value_func=lambda report: datetime.fromtimestamp(report.wake_up_time),
 )
 SENSOR_TYPE_AWAKE_PERCENT = SmartPillowEntityDescription(
     key="awake_percent",
@@ -74,7 +84,7 @@ SENSOR_TYPE_AWAKE_PERCENT = SmartPillowEntityDescription(
     icon="mdi:bed",
     native_unit_of_measurement=PERCENTAGE,
     state_class=SensorStateClass.MEASUREMENT,
-    value_func=lambda data: data["awake"]["percentage"],
+    value_func=lambda report: report.awake_percent,
 )
 SENSOR_TYPE_DEEP_PERCENT = SmartPillowEntityDescription(
     key="deep_sleep_percent",
@@ -82,7 +92,7 @@ SENSOR_TYPE_DEEP_PERCENT = SmartPillowEntityDescription(
     icon="mdi:bed",
     native_unit_of_measurement=PERCENTAGE,
     state_class=SensorStateClass.MEASUREMENT,
-    value_func=lambda data: data["deep"]["percentage"],
+    value_func=lambda report: report.deep_percent,
 )
 SENSOR_TYPE_LIGHT_PERCENT = SmartPillowEntityDescription(
     key="light_sleep_percent",
@@ -90,7 +100,7 @@ SENSOR_TYPE_LIGHT_PERCENT = SmartPillowEntityDescription(
     icon="mdi:bed",
     native_unit_of_measurement=PERCENTAGE,
     state_class=SensorStateClass.MEASUREMENT,
-    value_func=lambda data: data["light"]["percentage"],
+    value_func=lambda report: report.light_percent,
 )
 SENSOR_TYPE_REM_PERCENT = SmartPillowEntityDescription(
     key="rem_percent",
@@ -98,7 +108,7 @@ SENSOR_TYPE_REM_PERCENT = SmartPillowEntityDescription(
     icon="mdi:bed",
     native_unit_of_measurement=PERCENTAGE,
     state_class=SensorStateClass.MEASUREMENT,
-    value_func=lambda data: data["rem"]["percentage"],
+    value_func=lambda report: report.rem_percent,
 )
 SENSOR_TYPE_HEART_BEAT_AVG = SmartPillowEntityDescription(
     key="heart_beat_avg",
@@ -106,7 +116,7 @@ SENSOR_TYPE_HEART_BEAT_AVG = SmartPillowEntityDescription(
     icon="mdi:heart-pulse",
     native_unit_of_measurement="BPM",
     state_class=SensorStateClass.MEASUREMENT,
-    value_func=lambda data: data["heart_beat_avg"],
+    value_func=lambda report: report.heart_beat_avg,
 )
 SENSOR_TYPE_BREATHE_BEAT_AVG = SmartPillowEntityDescription(
     key="breath_rate_avg",
@@ -114,7 +124,7 @@ SENSOR_TYPE_BREATHE_BEAT_AVG = SmartPillowEntityDescription(
     icon="mdi:lungs",
     native_unit_of_measurement="BPM",
     state_class=SensorStateClass.MEASUREMENT,
-    value_func=lambda data: data["breath_avg"],
+    value_func=lambda report: report.breath_avg,
 )
 
 SENSOR_TYPE_SLEEP_DURATION_HR = SmartPillowEntityDescription(
@@ -123,56 +133,56 @@ SENSOR_TYPE_SLEEP_DURATION_HR = SmartPillowEntityDescription(
     icon="mdi:bed-clock",
     native_unit_of_measurement="Hour",
     state_class=SensorStateClass.MEASUREMENT,
-    value_func=lambda data: round((datetime.fromtimestamp(data["wake_up_time"]) - datetime.fromtimestamp(data["go_to_bed_time"])).total_seconds() / 3600, 1)
+    value_func=sleep_duration_hours,
 )
 
 SENSOR_TYPE_DEEP_SLEEP_TIME = SmartPillowEntityDescription(
     key="SLEEP_DEEP_TIME",
     name="Deep sleep time",
     icon="mdi:bed-clock",
-    value_func=lambda data: data["deep_sleep_time"]
+    value_func=lambda report: report.deep_sleep_time
 )
 
 SENSOR_TYPE_LIGHT_SLEEP_TIME = SmartPillowEntityDescription(
     key="SLEEP_LIGHT_TIME",
     name="Light sleep time",
     icon="mdi:bed-clock",
-    value_func=lambda data: data["light_sleep_time"]
+    value_func=lambda report: report.light_sleep_time
 )
 
 SENSOR_TYPE_REM_TIME = SmartPillowEntityDescription(
     key="SLEEP_REM_TIME",
     name="REM time",
     icon="mdi:bed-clock",
-    value_func=lambda data: data["rem_time"]
+    value_func=lambda report: report.rem_time
 )
 
 SENSOR_TYPE_AWAKE_TIME = SmartPillowEntityDescription(
     key="SLEEP_AWAKE_TIME",
     name="Awake time",
     icon="mdi:bed-clock",
-    value_func=lambda data: data["awake_time"]
+    value_func=lambda report: report.awake_time
 )
 
 SENSOR_TYPE_MOVE_TIME = SmartPillowEntityDescription(
     key="SLEEP_MOVE_TIME",
     name="Move time",
     icon="mdi:car-brake-worn-linings",
-    value_func=lambda data: data["move_time"]
+    value_func=lambda report: report.move_time
 )
 
 SENSOR_TYPE_REVOLVE_TIME = SmartPillowEntityDescription(
     key="SLEEP_REVOLVE_TIME",
     name="Revolve time",
     icon="mdi:reload",
-    value_func=lambda data: data["revolve_time"]
+    value_func=lambda report: report.revolve_time
 )
 
 SENSOR_TYPE_VIBRATE_COUNT = SmartPillowEntityDescription(
     key="SLEEP_VIBRATE_COUNT",
     name="Vibrate count",
     icon="mdi:vibrate",
-    value_func=lambda data: data["vibrate_count"],
+    value_func=lambda report: report.vibrate_count,
     state_class=SensorStateClass.TOTAL
 )
 
@@ -181,7 +191,7 @@ SENSOR_TYPE_SNORE_COUNT = SmartPillowEntityDescription(
     key="SLEEP_SNORE_COUNT",
     name="Snore count",
     icon="mdi:sleep",
-    value_func=lambda data: data["snore_count_total"],
+    value_func=lambda report: report.snore_count_total,
     state_class=SensorStateClass.TOTAL
 )
 
@@ -189,7 +199,7 @@ SENSOR_TYPE_VIBRATE_TIME = SmartPillowEntityDescription(
     key="SLEEP_VIBRATE_TIME",
     name="Vibrate time",
     icon="mdi:vibrate",
-    value_func=lambda data: data["vibrate_time"]
+    value_func=lambda report: report.vibrate_time
 )
 
 
@@ -197,7 +207,16 @@ SENSOR_TYPE_SNORE_COUNT_TIME = SmartPillowEntityDescription(
     key="SLEEP_SNORE_COUNT_TIME",
     name="Snore time",
     icon="mdi:sleep",
-    value_func=lambda data: data["snore_count_time"]
+    value_func=lambda report: report.snore_count_time
+)
+
+SENSOR_TYPE_HYPNOGRAM = SmartPillowEntityDescription(
+    key="hypnogram",
+    name="Hypnogram",
+    icon="mdi:chart-timeline-variant",
+    # State is the number of stage changes, the attributes hold the whole night
+    value_func=lambda report: report.sleep_stages.transition_count(),
+    attributes_func=hypnogram_attributes,
 )
 
 SUPPORTED_SENSORS = [SENSOR_TYPE_SLEEP_SCORE, SENSOR_TYPE_GO_TO_BED_TIME, SENSOR_TYPE_WAKE_UP_TIME
@@ -217,7 +236,23 @@ SUPPORTED_SENSORS = [SENSOR_TYPE_SLEEP_SCORE, SENSOR_TYPE_GO_TO_BED_TIME, SENSOR
                      , SENSOR_TYPE_VIBRATE_COUNT
                      , SENSOR_TYPE_SNORE_COUNT
                      , SENSOR_TYPE_VIBRATE_TIME
-                     , SENSOR_TYPE_SNORE_COUNT_TIME]
+                     , SENSOR_TYPE_SNORE_COUNT_TIME
+                     , SENSOR_TYPE_HYPNOGRAM]
+
+# Nightly values followed by the rolling trend sensors
+TREND_SENSORS = [sensor for sensor in SUPPORTED_SENSORS if sensor.key in TREND_METRICS]
+
+
+SENSOR_TYPE_REFRESH_LATENCY = SensorEntityDescription(
+    key="last_refresh_latency",
+    name="Last refresh latency",
+    icon="mdi:timer-outline",
+    native_unit_of_measurement="ms",
+    device_class=SensorDeviceClass.DURATION,
+    state_class=SensorStateClass.MEASUREMENT,
+    entity_category=EntityCategory.DIAGNOSTIC,
+    entity_registry_enabled_default=False,
+)
 
 
 async def async_setup_entry(
@@ -225,12 +260,79 @@ async def async_setup_entry(
     entry: config_entries.ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    entities = []
-    for coordinator in hass.data[DOMAIN][COORDINATORS]:
-        for sensor in SUPPORTED_SENSORS:
-            entities.append(SmartPillowSensorAdapter(coordinator, sensor))
+    coordinator = hass.data[DOMAIN][COORDINATORS][entry.entry_id]
+    value_table = SensorValueTable(coordinator.pillow_api)
+    async_add_entities(
+        (SmartPillowHypnogramSensor if sensor is SENSOR_TYPE_HYPNOGRAM else SmartPillowSensorAdapter)(
+            coordinator, sensor, value_table, slot
+        )
+        for slot, sensor in enumerate(SUPPORTED_SENSORS)
+    )
+    async_add_entities(
+        SmartPillowTrendSensor(coordinator, sensor, days)
+        for sensor in TREND_SENSORS
+        for days in TREND_WINDOWS
+    )
+    async_add_entities([SmartPillowRefreshLatencySensor(coordinator, SENSOR_TYPE_REFRESH_LATENCY)])
+
+
+def _device_info(did: str) -> DeviceInfo:
+    return DeviceInfo(
+        identifiers={(DOMAIN, did)},
+        manufacturer="YUDEE",
+        model="Dual-Mode Sleep Sensor",
+        name="Sleep Sensor",
+    )
+
+
+class SensorValueTable:
+    """Values of every SUPPORTED_SENSORS entry for the current report.
+
+    The table is rebuilt once when the API holds a new report, sensors then
+    read their slot instead of running their value_func on every state read.
+    """
+
+    __slots__ = ("_api", "_report", "_values", "_attributes")
+
+    def __init__(self, api: PillowCloudAPI) -> None:
+        self._api = api
+        self._report: NightReport | None = None
+        self._values: tuple = (None,) * len(SUPPORTED_SENSORS)
+        self._attributes: dict[int, dict[str, Any]] = {}
+
+    @staticmethod
+    def _compute(description: SmartPillowEntityDescription, report: NightReport):
+        try:
+            return description.value_func(report)
+        except (TypeError, ValueError):
+            # Incomplete report, e.g. no wake up time yet
+            return None
 
-    async_add_entities(entities)
+    def _rebuild(self, report: NightReport | None) -> None:
+        if report is None:
+            self._values = (None,) * len(SUPPORTED_SENSORS)
+            self._attributes = {}
+        else:
+            self._values = tuple(self._compute(sensor, report) for sensor in SUPPORTED_SENSORS)
+            self._attributes = {
+                slot: sensor.attributes_func(report)
+                for slot, sensor in enumerate(SUPPORTED_SENSORS)
+                if sensor.attributes_func is not None
+            }
+        self._report = report
+
+    def _refresh(self) -> None:
+        report = self._api.day_report
+        if report is not self._report:
+            self._rebuild(report)
+
+    def value(self, slot: int):
+        self._refresh()
+        return self._values[slot]
+
+    def attributes(self, slot: int) -> dict[str, Any] | None:
+        self._refresh()
+        return self._attributes.get(slot)
 
 
 class SmartPillowSensorAdapter(SensorEntity):
@@ -245,6 +347,8 @@ class SmartPillowSensorAdapter(SensorEntity):
         self,
         coordinator: SmartPillowAPICoordinator,
         description: SmartPillowEntityDescription,
+        value_table: SensorValueTable,
+        slot: int,
     ) -> None:
         # super().__init__(coordinator, description.name)
         # super().__init__()
@@ -254,30 +358,40 @@ class SmartPillowSensorAdapter(SensorEntity):
         self._attr_unique_id = f"{coordinator.pillow_api.did}_{description.key}"
         self._api = coordinator.pillow_api
         self.entity_description = description
-        self.unsub_update: CALLBACK_TYPE | None = None
+        self._value_table = value_table
+        self._slot = slot
+        self._written_value = None
+        self._written_attributes = None
 
     async def async_added_to_hass(self) -> None:
         """Handle entity which will be added."""
-        self.unsub_update = async_dispatcher_connect(
-            self.hass, DATA_UPDATED, self._schedule_immediate_update
+        self._written_value = self.native_value
+        self._written_attributes = self.extra_state_attributes
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, DATA_UPDATED.format(self._api.did), self._schedule_immediate_update
+            )
         )
 
-    async def will_remove_from_hass(self) -> None:
-        """Unsubscribe from update dispatcher."""
-        if self.unsub_update:
-            self.unsub_update()
-        self.unsub_update = None
-
     @callback
     def _schedule_immediate_update(self) -> None:
-        self.async_schedule_update_ha_state(True)
+        value = self.native_value
+        # Attributes are rebuilt once per report, so identity tells a new night apart
+        attributes = self.extra_state_attributes
+        if value == self._written_value and attributes is self._written_attributes:
+            return
+        self._written_value = value
+        self._written_attributes = attributes
+        self.async_write_ha_state()
 
     @property
     def native_value(self) -> float | None:
         """Return the state of the sensor."""
-        if (self._api.day_report is None):
-            return None
-        return self.entity_description.value_func(self._api.day_report)
+        return self._value_table.value(self._slot)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        return self._value_table.attributes(self._slot)
 
     def available(self) -> bool:
         return self._api.day_report is None
@@ -285,10 +399,90 @@ class SmartPillowSensorAdapter(SensorEntity):
     @property
     def device_info(self) -> DeviceInfo:
         """Return info about the device."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._api.did)},
-            manufacturer="YUDEE",
-            model="Dual-Mode Sleep Sensor",
-            name="Sleep Sensor",
+        return _device_info(self._api.did)
+
+
+class SmartPillowHypnogramSensor(SmartPillowSensorAdapter):
+    """Stage changes of the night, the whole night in attributes kept out of the recorder."""
+
+    _unrecorded_attributes = LARGE_ATTRIBUTES
+
+
+class SmartPillowTrendSensor(SensorEntity):
+    """Rolling average of a nightly value, with its standard deviation as attribute."""
+
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(
+        self,
+        coordinator: SmartPillowAPICoordinator,
+        description: SmartPillowEntityDescription,
+        days: int,
+    ) -> None:
+        self._api = coordinator.pillow_api
+        self._trends = coordinator.trends
+        self._metric = description.key
+        self._days = days
+        self._attr_unique_id = f"{self._api.did}_{description.key}_{days}d_average"
+        self._attr_name = f"{description.name} {days} day average"
+        self._attr_icon = description.icon
+        self._attr_native_unit_of_measurement = description.native_unit_of_measurement
+
+    async def async_added_to_hass(self) -> None:
+        """Handle entity which will be added."""
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, DATA_UPDATED.format(self._api.did), self.async_write_ha_state)
         )
 
+    @property
+    def native_value(self) -> float | None:
+        stat = self._trends.stat(self._metric, self._days)
+        return round(stat.mean, 1) if stat.count else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        stat = self._trends.stat(self._metric, self._days)
+        std_dev = stat.std_dev
+        return {
+            "std_dev": None if std_dev is None else round(std_dev, 2),
+            "nights": stat.count,
+        }
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return info about the device."""
+        return _device_info(self._api.did)
+
+
+class SmartPillowRefreshLatencySensor(CoordinatorEntity, SensorEntity):
+    """Duration of the last cloud refresh, with the last duration of every phase as attributes."""
+
+    def __init__(
+        self,
+        coordinator: SmartPillowAPICoordinator,
+        description: SensorEntityDescription,
+    ) -> None:
+        super().__init__(coordinator)
+        self._api = coordinator.pillow_api
+        self.entity_description = description
+        self._attr_unique_id = f"{self._api.did}_{description.key}"
+
+    @property
+    def native_value(self) -> float | None:
+        last = self._api.timings.last(PHASE_REFRESH)
+        return None if last is None else round(last, 1)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        timings = self._api.timings
+        return {
+            f"{phase}_ms": None if (last := timings.last(phase)) is None else round(last, 1)
+            for phase in PHASES
+            if phase not in (PHASE_REFRESH, PHASE_CACHED_REFRESH)
+        }
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return info about the device."""
+        return _device_info(self._api.did)
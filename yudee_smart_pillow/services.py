@@ -0,0 +1,196 @@
+"""Services of the YUDEE Pillow integration."""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+import logging
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+from homeassistant.util import dt as dt_util
+
+from .const import COORDINATORS, DOMAIN, FETCH_JOBS
+from .long_term_statistics import async_backfill_statistics
+from .report_jobs import DEFAULT_FETCH_CONCURRENCY
+from .smart_pillow.series import DEFAULT_SERIES_RESOLUTION, MIN_SERIES_RESOLUTION, SERIES_SOURCES
+from .smart_pillow.timeline import stage_summary
+
+if TYPE_CHECKING:
+    from . import SmartPillowAPICoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_IMPORT_STATISTICS = "import_statistics"
+SERVICE_EXPORT_SERIES = "export_series"
+SERVICE_QUERY_SLEEP_STAGES = "query_sleep_stages"
+SERVICE_FETCH_REPORTS = "fetch_reports"
+SERVICE_CANCEL_FETCH_REPORTS = "cancel_fetch_reports"
+
+ATTR_DEVICE_ID = "device_id"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+ATTR_DATE = "date"
+ATTR_RESOLUTION = "resolution"
+ATTR_SERIES = "series"
+ATTR_MAX_CONCURRENCY = "max_concurrency"
+ATTR_JOB_ID = "job_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_AT = "at"
+
+DEFAULT_BACKFILL_DAYS = 90
+DEFAULT_FETCH_DAYS = 30
+MAX_FETCH_CONCURRENCY = 8
+
+IMPORT_STATISTICS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+    }
+)
+
+EXPORT_SERIES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_DATE): cv.date,
+        vol.Optional(ATTR_RESOLUTION, default=DEFAULT_SERIES_RESOLUTION): vol.All(
+            vol.Coerce(int), vol.Range(min=MIN_SERIES_RESOLUTION, max=24 * 60 * 60)
+        ),
+        vol.Optional(ATTR_SERIES): vol.All(cv.ensure_list, [vol.In(SERIES_SOURCES)]),
+    }
+)
+
+QUERY_SLEEP_STAGES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_DATE): cv.date,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_AT): cv.datetime,
+    }
+)
+
+FETCH_REPORTS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+        vol.Optional(ATTR_MAX_CONCURRENCY, default=DEFAULT_FETCH_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_FETCH_CONCURRENCY)
+        ),
+    }
+)
+
+CANCEL_FETCH_REPORTS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(ATTR_JOB_ID): cv.string,
+            vol.Optional(ATTR_DEVICE_ID): cv.string,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_JOB_ID, ATTR_DEVICE_ID),
+)
+
+
+@callback
+def coordinator_for_device(hass: HomeAssistant, device_id: str) -> SmartPillowAPICoordinator:
+    """Return the coordinator of a pillow device registry entry."""
+    device = dr.async_get(hass).async_get(device_id)
+    if device is None:
+        raise HomeAssistantError(f"Unknown device {device_id}")
+    dids = {identifier for domain, identifier in device.identifiers if domain == DOMAIN}
+    for coordinator in hass.data[DOMAIN][COORDINATORS].values():
+        if coordinator.pillow_api.did in dids:
+            return coordinator
+    raise HomeAssistantError(f"Device {device_id} is not a loaded YUDEE pillow")
+
+
+def date_range(call: ServiceCall, default_days: int) -> tuple[date, date]:
+    """Return the inclusive day range of a service call, ending last night by default."""
+    end = call.data.get(ATTR_END_DATE) or (datetime.now() - timedelta(days=1)).date()
+    start = call.data.get(ATTR_START_DATE) or end - timedelta(days=default_days - 1)
+    if start > end:
+        raise HomeAssistantError(f"{ATTR_START_DATE} must not be after {ATTR_END_DATE}")
+    return start, end
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    async def async_import_statistics(call: ServiceCall) -> None:
+        coordinator = coordinator_for_device(hass, call.data[ATTR_DEVICE_ID])
+        start, end = date_range(call, DEFAULT_BACKFILL_DAYS)
+        imported = await async_backfill_statistics(hass, coordinator, start, end)
+        _LOGGER.info("Imported %s nights from %s to %s for %s", imported, start, end, coordinator.pillow_api.did)
+
+    async def async_export_series(call: ServiceCall) -> ServiceResponse:
+        coordinator = coordinator_for_device(hass, call.data[ATTR_DEVICE_ID])
+        day = call.data.get(ATTR_DATE) or (datetime.now() - timedelta(days=1)).date()
+        await coordinator.async_ensure_token()
+        # Returned to the caller only, on the event bus the recorder would store every export
+        return await coordinator.pillow_api.fetch_series(
+            day, call.data[ATTR_RESOLUTION], call.data.get(ATTR_SERIES)
+        )
+
+    async def async_query_sleep_stages(call: ServiceCall) -> ServiceResponse:
+        coordinator = coordinator_for_device(hass, call.data[ATTR_DEVICE_ID])
+        day = call.data.get(ATTR_DATE) or (datetime.now() - timedelta(days=1)).date()
+        await coordinator.async_ensure_token()
+        report = await coordinator.pillow_api.fetch_night(day)
+        # Naive datetimes are in the Home Assistant time zone
+        instants = {
+            key: dt_util.as_timestamp(call.data[key]) if key in call.data else None
+            for key in (ATTR_START, ATTR_END, ATTR_AT)
+        }
+        return {"day": day.isoformat(), **stage_summary(report.sleep_stages, **instants)}
+
+    async def async_fetch_reports(call: ServiceCall) -> ServiceResponse:
+        coordinator = coordinator_for_device(hass, call.data[ATTR_DEVICE_ID])
+        start, end = date_range(call, DEFAULT_FETCH_DAYS)
+        job_id = hass.data[DOMAIN][FETCH_JOBS].async_start(
+            coordinator, call.data[ATTR_DEVICE_ID], start, end, call.data[ATTR_MAX_CONCURRENCY]
+        )
+        _LOGGER.debug("Started fetch job %s from %s to %s for %s", job_id, start, end, coordinator.pillow_api.did)
+        if call.return_response:
+            return {ATTR_JOB_ID: job_id}
+        return None
+
+    async def async_cancel_fetch_reports(call: ServiceCall) -> None:
+        entry_id = None
+        if ATTR_DEVICE_ID in call.data:
+            entry_id = coordinator_for_device(hass, call.data[ATTR_DEVICE_ID]).entry.entry_id
+        cancelled = hass.data[DOMAIN][FETCH_JOBS].async_cancel(call.data.get(ATTR_JOB_ID), entry_id)
+        _LOGGER.debug("Cancelled %s fetch jobs", cancelled)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_IMPORT_STATISTICS, async_import_statistics, schema=IMPORT_STATISTICS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_SERIES,
+        async_export_series,
+        schema=EXPORT_SERIES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_SLEEP_STAGES,
+        async_query_sleep_stages,
+        schema=QUERY_SLEEP_STAGES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FETCH_REPORTS,
+        async_fetch_reports,
+        schema=FETCH_REPORTS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_CANCEL_FETCH_REPORTS, async_cancel_fetch_reports, schema=CANCEL_FETCH_REPORTS_SCHEMA
+    )
@@ -0,0 +1,86 @@
+"""Fleet wide spreading and limiting of cloud polls."""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+import datetime
+import hashlib
+import math
+from typing import Any, AsyncIterator
+
+DEFAULT_MAX_IN_FLIGHT = 4
+# Polls of the fleet are spread over this period
+DEFAULT_STAGGER_PERIOD = datetime.timedelta(minutes=10)
+
+
+class FleetScheduler:
+    """Stagger device polls and cap the cloud requests in flight.
+
+    Every device gets a deterministic phase within the stagger period derived
+    from its did, and poll times are snapped onto that phase so devices do not
+    poll together after a restart or when the morning window opens.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        stagger_period: datetime.timedelta = DEFAULT_STAGGER_PERIOD,
+    ) -> None:
+        self._max_in_flight = max_in_flight
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._period = stagger_period.total_seconds()
+        self._waiting = 0
+        self._in_flight = 0
+        self._peak_waiting = 0
+
+    def phase(self, did: str) -> float:
+        """Return the offset in seconds of did within the stagger period."""
+        digest = hashlib.blake2b(did.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2**64 * self._period
+
+    def stagger(self, did: str, now: datetime.datetime, delay: datetime.timedelta) -> datetime.timedelta:
+        """Move the poll after delay onto the nearest phase point of did.
+
+        The result differs from delay by at most one period and is never less
+        than half of it, so a device polling late keeps its phase.
+        """
+        phase = self.phase(did)
+        start = now.timestamp()
+        due = start + delay.total_seconds()
+        aligned = math.floor((due - phase) / self._period + 0.5) * self._period + phase
+        while aligned - start < delay.total_seconds() / 2:
+            aligned += self._period
+        return datetime.timedelta(seconds=aligned - start)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the fleet wide request slots."""
+        self._waiting += 1
+        self._peak_waiting = max(self._peak_waiting, self._waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a slot."""
+        return self._waiting
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "max_in_flight": self._max_in_flight,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "peak_queue_depth": self._peak_waiting,
+        }
@@ -0,0 +1,95 @@
+"""Compact encoding of a whole night for the hypnogram sensor."""
+from __future__ import annotations
+
+from typing import Any
+
+from .metrics import STATE_AWAKE, STATE_DEEP_SLEEP, STATE_LIGHT_SLEEP, STATE_REM_SLEEP
+from .report import NightReport
+from .timeline import EventTimeline, SleepStageTimeline
+
+# Seconds covered by one hypnogram slot
+HYPNOGRAM_RESOLUTION = 60
+
+STAGE_CODES = {
+    STATE_DEEP_SLEEP: "D",
+    STATE_LIGHT_SLEEP: "L",
+    STATE_REM_SLEEP: "R",
+    STATE_AWAKE: "W",
+}
+# Slots not covered by any segment
+GAP_CODE = "-"
+UNKNOWN_CODE = "?"
+
+# (attribute, NightReport timeline)
+EVENT_ATTRIBUTES = (
+    ("move", "body_move"),
+    ("revolve", "body_revolve"),
+    ("vibrate", "snore"),
+    ("snore", "snore_count"),
+)
+# Attributes that grow with the night, every state change would store them again
+LARGE_ATTRIBUTES = frozenset({"stages", *(attribute for attribute, _ in EVENT_ATTRIBUTES)})
+
+
+def _slot(instant: int, origin: int, resolution: int) -> int:
+    return (instant - origin + resolution // 2) // resolution
+
+
+def encode_stages(timeline: SleepStageTimeline, resolution: int = HYPNOGRAM_RESOLUTION) -> str:
+    """Run-length encode the stages in slots of resolution seconds from the first segment.
+
+    Every run is a stage code followed by its length in slots, e.g. "W3L25D40-2L12".
+    Segment bounds are rounded to the nearest slot, so runs always add up to
+    the length of the night.
+    """
+    if not len(timeline):
+        return ""
+    origin = timeline.start
+    runs: list[list] = []
+    position = 0
+
+    for start, end, stage in zip(timeline.starts, timeline.ends, timeline.stages):
+        first = _slot(start, origin, resolution)
+        last = _slot(end, origin, resolution)
+        for code, length in ((GAP_CODE, first - position), (STAGE_CODES.get(stage, UNKNOWN_CODE), last - first)):
+            if length <= 0:
+                continue
+            if runs and runs[-1][0] == code:
+                runs[-1][1] += length
+            else:
+                runs.append([code, length])
+        position = max(position, last)
+
+    return "".join(f"{code}{length}" for code, length in runs)
+
+
+def encode_events(timeline: EventTimeline, origin: int, resolution: int = HYPNOGRAM_RESOLUTION) -> list[list[int]]:
+    """Return [offsets, values] of the events, offsets in slots and delta encoded."""
+    offsets = []
+    previous = 0
+    for instant in timeline.times:
+        slot = _slot(instant, origin, resolution)
+        offsets.append(slot - previous)
+        previous = slot
+    return [offsets, list(timeline.values)]
+
+
+def hypnogram_attributes(report: NightReport, resolution: int = HYPNOGRAM_RESOLUTION) -> dict[str, Any]:
+    """Return the full night as compact state attributes.
+
+    start is the timestamp of slot 0. Event offsets count slots from start,
+    each one relative to the previous event of the same kind.
+    """
+    stages = report.sleep_stages
+    origin = stages.start if len(stages) else report.go_to_bed_time
+    if origin is None:
+        return {}
+
+    attributes: dict[str, Any] = {
+        "start": origin,
+        "resolution": resolution,
+        "stages": encode_stages(stages, resolution),
+    }
+    for attribute, source in EVENT_ATTRIBUTES:
+        attributes[attribute] = encode_events(getattr(report, source), origin, resolution)
+    return attributes
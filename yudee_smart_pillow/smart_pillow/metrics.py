@@ -0,0 +1,122 @@
+"""Derived report fields computed in a single pass over the getday arrays."""
+from __future__ import annotations
+
+import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+
+STATE_DEEP_SLEEP = 1
+STATE_LIGHT_SLEEP = 2
+STATE_REM_SLEEP = 3
+STATE_AWAKE = 4
+
+SLEEP_TIME_FIELDS = {
+    STATE_DEEP_SLEEP: "deep_sleep_time",
+    STATE_LIGHT_SLEEP: "light_sleep_time",
+    STATE_REM_SLEEP: "rem_time",
+    STATE_AWAKE: "awake_time",
+}
+
+# (source array, time string field, total field)
+EVENT_FIELDS = (
+    ("body_revolve", "revolve_time", None),
+    ("body_move", "move_time", None),
+    ("snore", "vibrate_time", "vibrate_count"),
+    ("snore_count", "snore_count_time", "snore_count_total"),
+)
+
+# Time strings stop growing past these lengths to stay below the 255 char state limit
+MAX_SLEEP_TIME_LENGTH = 240
+MAX_EVENT_TIME_LENGTH = 245
+
+_VALUE = itemgetter("value")
+
+SEPARATOR = " | "
+EMPTY = "-"
+
+
+@lru_cache(maxsize=4096)
+def _format_minute(minute: int) -> str:
+    return datetime.datetime.fromtimestamp(minute).strftime("%-H:%M")
+
+
+def format_time(timestamp: int) -> str:
+    """Format a timestamp as H:MM in local time, cached per minute."""
+    timestamp = int(timestamp)
+    return _format_minute(timestamp - timestamp % 60)
+
+
+def _sleep_times(segments: list[dict]) -> dict[str, str]:
+    # Per state: list of [start, end] strings and the joined length so far
+    ranges: dict[int, list[list[str]]] = {state: [] for state in SLEEP_TIME_FIELDS}
+    lengths = dict.fromkeys(SLEEP_TIME_FIELDS, 0)
+    full = set()
+
+    for segment in segments:
+        state = segment["status"]
+        if state not in ranges or state in full:
+            continue
+        if lengths[state] > MAX_SLEEP_TIME_LENGTH:
+            full.add(state)
+            if len(full) == len(ranges):
+                break
+            continue
+
+        start = format_time(segment["start"])
+        end = format_time(segment["end"])
+        state_ranges = ranges[state]
+        if state_ranges and state_ranges[-1][1] == start:
+            # Contiguous with the previous range of this state, extend it
+            lengths[state] += len(end) - len(state_ranges[-1][1])
+            state_ranges[-1][1] = end
+            continue
+
+        if state_ranges:
+            lengths[state] += len(SEPARATOR)
+        lengths[state] += len(start) + 1 + len(end)
+        state_ranges.append([start, end])
+
+    return {
+        field: SEPARATOR.join(f"{start}-{end}" for start, end in ranges[state]) or EMPTY
+        for state, field in SLEEP_TIME_FIELDS.items()
+    }
+
+
+def _event_times(events: list[dict], with_total: bool) -> tuple[str, int]:
+    parts = []
+    length = 0
+    total = 0
+
+    for index, event in enumerate(events):
+        if length > MAX_EVENT_TIME_LENGTH:
+            # String is full, only the total still needs the remaining events
+            if with_total:
+                total += sum(map(_VALUE, islice(events, index, None)))
+            break
+
+        value = event["value"]
+        total += value
+        part = f"{format_time(event['time'])} [{value}]"
+        if parts:
+            length += len(SEPARATOR)
+        length += len(part)
+        parts.append(part)
+
+    return SEPARATOR.join(parts) or EMPTY, total
+
+
+def compute_derived_metrics(report: dict) -> dict:
+    """Return every derived field of a getday report.
+
+    Each array of the report is walked once, producing the time strings shown
+    by the *_time sensors and the totals of the count sensors.
+    """
+    derived = _sleep_times(report.get("sleep_data") or [])
+    for source, time_field, total_field in EVENT_FIELDS:
+        event_time, total = _event_times(report.get(source) or [], total_field is not None)
+        derived[time_field] = event_time
+        if total_field is not None:
+            derived[total_field] = total
+
+    return derived
@@ -0,0 +1,46 @@
+"""Decoding and debug logging helpers for cloud responses."""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with Home Assistant
+    orjson = None
+
+# Logged payloads are cut to this many bytes
+LOG_PAYLOAD_LIMIT = 512
+
+
+def json_loads(raw: bytes) -> Any:
+    """Decode a response body, with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def fingerprint(data: Any) -> str:
+    """Return a stable content hash of decoded report data."""
+    if orjson is not None:
+        encoded = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    else:
+        encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class TruncatedPayload:
+    """Render a raw payload for logging only when a record is emitted."""
+
+    __slots__ = ("_raw", "_limit")
+
+    def __init__(self, raw: bytes, limit: int = LOG_PAYLOAD_LIMIT) -> None:
+        self._raw = raw
+        self._limit = limit
+
+    def __str__(self) -> str:
+        text = self._raw[: self._limit].decode("utf-8", "replace")
+        if len(self._raw) > self._limit:
+            text += f"... ({len(self._raw)} bytes)"
+        return text
@@ -1,23 +1,44 @@
-from aiohttp import ClientSession, web
+from aiohttp import ClientError, ClientResponseError, ClientSession, web
+import async_timeout
 import asyncio
+import contextlib
 import time
 import hashlib
 import datetime
-import json
 import logging
 
+from .fleet import FleetScheduler
+from .payload import TruncatedPayload, json_loads
+from .report import NightReport
+from .report_cache import ReportCache
+from .series import DEFAULT_SERIES_RESOLUTION, report_series
+from .timing import PHASE_DECODE, PHASE_HTTP, PHASE_METRICS, PHASE_QUEUE, RefreshTimings
+from .resilience import (
+    RETRY_ATTEMPTS,
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+    is_transient,
+)
+
 _LOGGER = logging.getLogger(__name__)
 
-STATE_DEEP_SLEEP = 1
-STATE_LIGHT_SLEEP = 2
-STATE_REM_SLEEP = 3
-STATE_AWAKE = 4
+DEFAULT_RANGE_CONCURRENCY = 4
+
+DEFAULT_BASE_URL = "http://beacon5c.mirahome.net/beacon5"
+PATH_FASTLOGIN = "/client/fastlogin"
+PATH_GETDAY = "/client/beacon/getday"
 
+# Seconds allowed for a single attempt per endpoint
+ENDPOINT_TIMEOUTS = {
+    PATH_FASTLOGIN: 10,
+    PATH_GETDAY: 15,
+}
 
 
 class PillowCloudAPI:
 
-    def __init__(self, session: ClientSession, cname: str, cnameType: str, uid: str, mac: str, sort: str) -> None:
+    def __init__(self, session: ClientSession, cname: str, cnameType: str, uid: str, mac: str, sort: str, report_cache: ReportCache | None = None, circuit_breaker: CircuitBreaker | None = None, base_url: str = DEFAULT_BASE_URL, fleet: FleetScheduler | None = None, timings: RefreshTimings | None = None) -> None:
         self._session = session
         self._cname = cname
         self._cname_type = cnameType
@@ -26,7 +47,13 @@ class PillowCloudAPI:
         self._sort = sort
         self._token = ""
         self._last_get_token = None
-        self._day_report = {}
+        self._day_report: NightReport | None = None
+        self._day_report_from_cache = False
+        self._report_cache = report_cache
+        self._circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._base_url = base_url.rstrip("/")
+        self._fleet = fleet
+        self._timings = timings if timings is not None else RefreshTimings()
 
     def timestamp(self):
         return str(int(time.time()))
@@ -38,187 +65,200 @@ class PillowCloudAPI:
 
         return result.hexdigest()
 
+    @property
+    def timings(self) -> RefreshTimings:
+        return self._timings
+
+    def _request_slot(self):
+        if self._fleet is None:
+            return contextlib.nullcontext()
+        return self._fleet.slot()
+
+    async def _post(self, path: str, body: dict, headers: dict | None = None) -> bytes:
+        """POST to the cloud, retrying transient errors with backoff and jitter."""
+        url = self._base_url + path
+        breaker = self._circuit_breaker
+        timings = self._timings
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            if not breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open, not calling {url}")
+            try:
+                queued = time.perf_counter()
+                async with self._request_slot():
+                    timings.record(PHASE_QUEUE, time.perf_counter() - queued)
+                    with timings.span(PHASE_HTTP):
+                        async with async_timeout.timeout(ENDPOINT_TIMEOUTS[path]):
+                            async with self._session.post(
+                                url, raise_for_status=True, headers=headers, json=body
+                            ) as resp:
+                                raw = await resp.read()
+            except (asyncio.TimeoutError, ClientError) as err:
+                if not is_transient(err):
+                    # The cloud answered, it is just not happy with the request
+                    breaker.record_success()
+                    raise
+                breaker.record_failure(err)
+                if attempt == RETRY_ATTEMPTS:
+                    raise
+                delay = backoff_delay(attempt)
+                _LOGGER.debug("Attempt %s on %s failed (%r), retrying in %.2fs", attempt, url, err, delay)
+                await asyncio.sleep(delay)
+            except BaseException:
+                breaker.abandon()
+                raise
+            else:
+                breaker.record_success()
+                return raw
+
     async def get_token(self):
         _LOGGER.debug("Get token")
         timestamp = self.timestamp()
         md5_hash = self.calculate_md5(timestamp)
-        url = "http://beacon5c.mirahome.net/beacon5/client/fastlogin"
         body = {"cname": self._cname, "tmsp": timestamp, "sign": md5_hash, "did": self._did, "uid": self._uid}
 
-        async with self._session.post(
-            url, raise_for_status=True, json=body
-        ) as resp:
-            resp_json = await resp.json()
-            if resp_json["code"] != "1000":
-                raise web.HTTPUnauthorized(
-                    reason=f"error code {resp_json['code']}"
-                )
-            # print(resp_json)
-            # self._token = resp_json["data"]
-            # self._last_get_token = datetime.datetime.now()
-            return resp_json["data"]
+        resp_json = json_loads(await self._post(PATH_FASTLOGIN, body))
+        if resp_json["code"] != "1000":
+            raise web.HTTPUnauthorized(
+                reason=f"error code {resp_json['code']}"
+            )
+        return resp_json["data"]
 
     def set_token(self, token:str):
         self._token = token
 
-    def get_status_sleep_time(self, state:int):
-        occured_time = ""
-        prev_end = ""
-
-        if self._day_report is None:
-            return "-"
-
-        for data in self._day_report['sleep_data']:
-            
-
-            if data["status"] == state:
-
-                if len(occured_time) > 240:
-                    break
-  
-                start = datetime.datetime.fromtimestamp(data["start"]).strftime("%-H:%M")
-                end = datetime.datetime.fromtimestamp(data["end"]).strftime("%-H:%M")
-                if (start == prev_end):
-                    occured_time.replace(prev_end,end)
-                    continue
-                else:
-                    if occured_time != "":
-                        occured_time += " | "
-                    occured_time += f"{start}-{end}"
-
-                prev_end = end
-
-
-        
-        if occured_time == "":
-            return "-"
-
-        return occured_time
-
-    def get_status_revolve(self):
-        event = ""
-        for data in self._day_report['body_revolve']:
-            if len(event) > 245:
-                break
-            if event != "":
-                    event += " | "
-            event += f"{datetime.datetime.fromtimestamp(data['time']).strftime('%-H:%M')} [{data['value']}]"
-
-        if event == "":
-            return "-"
-
-        return event
-        
-
-    def get_status_body_move(self):
-        event = ""
-        for data in self._day_report['body_move']:
-            if len(event) > 245:
-                break
-
-            if event != "":
-                    event += " | "
-            event += f"{datetime.datetime.fromtimestamp(data['time']).strftime('%-H:%M')} [{data['value']}]"
-
-        if event == "":
-            return "-"
-
-        return event
-
-    def get_status_vibrate_time(self):
-        event = ""
-        for data in self._day_report['snore']:
-            if len(event) > 245:
-                break
-
-            if event != "":
-                    event += " | "
-            event += f"{datetime.datetime.fromtimestamp(data['time']).strftime('%-H:%M')} [{data['value']}]"
-
-        if event == "":
-            return "-"
-
-        return event
-
-    def get_status_snore_count_time(self):
-        event = ""
-        for data in self._day_report['snore_count']:
-            if len(event) > 245:
-                break
-
-            if event != "":
-                    event += " | "
-            event += f"{datetime.datetime.fromtimestamp(data['time']).strftime('%-H:%M')} [{data['value']}]"
-
-        if event == "":
-            return "-"
+    async def _fetch_day(self, date: datetime.date) -> tuple[NightReport, bool]:
+        """Return the report of date and whether the cache answered without a request."""
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        if self._report_cache is not None:
+            cached = self._report_cache.get(self._did, date)
+            if cached is not None:
+                _LOGGER.debug("Report for %s served from cache", date)
+                return cached, True
 
-        return event
-
-        
-    def get_status_vibrate_count(self):
-        sum = 0
-        for data in self._day_report['snore']:
-            sum += data['value']
-
-        return sum
-
-    def get_status_snore_count(self):
-        sum = 0
-        for data in self._day_report['snore_count']:
-            sum += data['value']
-
-        return sum
-
-
-
-
-    async def fetch_report_day(self, date: datetime):
+        target_day = date.strftime("%Y-%m-%d")
+        timestamp = self.timestamp()
+        header = {"token": self._token}
+        body = {"cname": self._cname, "tmsp": timestamp, "day": target_day, "did": self._did, "uid": self._uid, "timezone": 7}
+        _LOGGER.debug("Fetch report %s for %s", target_day, self._did)
+        try:
+            raw = await self._post(PATH_GETDAY, body, header)
+        except (CircuitOpenError, asyncio.TimeoutError, ClientError) as err:
+            if isinstance(err, ClientResponseError) and not is_transient(err):
+                raise
+            # Serve whatever we had for this night while the cloud is unhealthy
+            stale = None
+            if self._report_cache is not None:
+                stale = self._report_cache.get(self._did, date, allow_stale=True)
+            if stale is None:
+                raise
+            _LOGGER.debug("Cloud unavailable (%r), serving cached report for %s", err, date)
+            return stale, False
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("DATA From API %s", TruncatedPayload(raw))
+        with self._timings.span(PHASE_DECODE):
+            resp_json = json_loads(raw)
+        if int(resp_json["code"]) != 1000:
+            _LOGGER.debug("Error - Resp code = %s", resp_json["code"])
+            raise web.HTTPUnauthorized(
+                reason=f"error code {resp_json['code']}"
+            )
+        with self._timings.span(PHASE_METRICS):
+            report = NightReport.from_getday(date, resp_json["data"])
+
+        # Only the compact model is kept, the raw payload goes out of scope here
+        if self._report_cache is not None:
+            self._report_cache.put(self._did, date, report)
+        return report, False
+
+    async def fetch_report_day(self, date: datetime) -> NightReport:
         _LOGGER.debug("Fetch_report_day")
 
         # if (self._last_get_token is None or datetime.datetime.now() - self._last_get_token > datetime.timedelta(hours=2)):
         #     await self.refresh_token()
 
-        url = "http://beacon5c.mirahome.net/beacon5/client/beacon/getday"
-        target_day = date.strftime("%Y-%m-%d")
-        # target_day = "2022-12-11"
-        timestamp = self.timestamp()
-        header = {"token": self._token}
-        body = {"cname": self._cname, "tmsp": timestamp, "day": target_day, "did": self._did, "uid": self._uid, "timezone": 7}
-        _LOGGER.debug(body)
-        async with self._session.post(
-            url, raise_for_status=True, headers=header, json=body
-        ) as resp:
-            resp_json = await resp.json()
-            _LOGGER.debug(f"DATA From API {resp_json}")
-            if int(resp_json["code"]) != 1000:
-                _LOGGER.debug(f"Error - Resp code = {resp_json['code']}")
-                raise web.HTTPUnauthorized(
-                    reason=f"error code {resp_json['code']}"
-                )
-            data = resp_json["data"]
-            
-            self._day_report = data
-            self._day_report["deep_sleep_time"] = self.get_status_sleep_time(STATE_DEEP_SLEEP)
-            self._day_report["light_sleep_time"] = self.get_status_sleep_time(STATE_LIGHT_SLEEP)
-            self._day_report["rem_time"] = self.get_status_sleep_time(STATE_REM_SLEEP)
-            self._day_report["awake_time"] = self.get_status_sleep_time(STATE_AWAKE)
-            self._day_report["revolve_time"] = self.get_status_revolve()
-            self._day_report["move_time"] = self.get_status_body_move()
-            self._day_report["vibrate_count"] = self.get_status_vibrate_count()
-            self._day_report["vibrate_time"] = self.get_status_vibrate_time()
-            self._day_report["snore_count_total"] = self.get_status_snore_count()
-            self._day_report["snore_count_time"] = self.get_status_snore_count_time()
-            return self._day_report
+        self._day_report_from_cache = False
+        self._day_report, self._day_report_from_cache = await self._fetch_day(date)
+        return self._day_report
+
+    async def fetch_report_range(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        max_concurrency: int = DEFAULT_RANGE_CONCURRENCY,
+        return_exceptions: bool = False,
+    ):
+        """Fetch every day from start to end (inclusive) concurrently.
+
+        Yields (day, report) tuples in completion order. At most
+        max_concurrency requests are in flight, all sharing the current token.
+        With return_exceptions a failed day yields (day, exception) instead of
+        ending the range. The day report exposed by day_report is left untouched.
+        """
+        if isinstance(start, datetime.datetime):
+            start = start.date()
+        if isinstance(end, datetime.datetime):
+            end = end.date()
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        days = [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(day: datetime.date):
+            async with semaphore:
+                try:
+                    report, _from_cache = await self._fetch_day(day)
+                    return day, report
+                except Exception as err:  # pylint: disable=broad-except
+                    if not return_exceptions:
+                        raise
+                    return day, err
+
+        tasks = [asyncio.ensure_future(fetch(day)) for day in days]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     async def fetch_last_night_report(self):
         yesterday_date = datetime.datetime.now() - datetime.timedelta(days=1)
         return await self.fetch_report_day(yesterday_date)
 
+    async def fetch_night(self, date: datetime.date) -> NightReport:
+        """Return the report of a night, leaving the day report exposed by day_report untouched."""
+        report, _from_cache = await self._fetch_day(date)
+        return report
+
+    async def fetch_series(
+        self,
+        date: datetime.date,
+        resolution: int = DEFAULT_SERIES_RESOLUTION,
+        names: list[str] | None = None,
+    ) -> dict:
+        """Return the per-sample arrays of a night downsampled to resolution seconds.
+
+        The day report exposed by day_report is left untouched.
+        """
+        return report_series(await self.fetch_night(date), resolution, names)
+
     @property
-    def day_report(self):
+    def day_report(self) -> NightReport | None:
         return self._day_report
 
+    @property
+    def day_report_from_cache(self) -> bool:
+        """Whether the last fetch_report_day was answered by the cache without a request."""
+        return self._day_report_from_cache
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        return self._circuit_breaker
+
     @property
     def did(self):
         return self._did
@@ -0,0 +1,82 @@
+"""Poll scheduling that follows the sleep cycle of a pillow user."""
+from __future__ import annotations
+
+import datetime
+
+# Wake up time assumed until one has been learned, in minutes after midnight
+DEFAULT_WAKE_MINUTE = 7 * 60
+# Weight of the newest night in the learned wake up time
+WAKE_SMOOTHING = 0.3
+
+# The morning window starts this long before the expected wake up time ...
+MORNING_WINDOW_BEFORE = datetime.timedelta(minutes=30)
+# ... and ends this long after it
+MORNING_WINDOW_AFTER = datetime.timedelta(hours=4)
+
+ACTIVE_INTERVAL = datetime.timedelta(minutes=10)
+# Catch-up interval when the window passed without a final report ...
+IDLE_INTERVAL = datetime.timedelta(hours=3)
+# ... until this long after the expected wake up time, when the user may be asleep again
+CATCH_UP_END = datetime.timedelta(hours=14)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class AdaptivePollSchedule:
+    """Decide when to poll next based on the expected wake up time.
+
+    Polls often in the morning window after the usual wake up time until last
+    night's report is final, then stays idle until the next morning.
+    """
+
+    def __init__(self, wake_minute: float | None = None) -> None:
+        self._wake_minute = wake_minute
+        self._last_learned_day: datetime.date | None = None
+
+    @property
+    def expected_wake_minute(self) -> float:
+        """Minutes after midnight the user usually wakes up."""
+        if self._wake_minute is None:
+            return DEFAULT_WAKE_MINUTE
+        return self._wake_minute
+
+    def learn(self, day: datetime.date, wake_up_time: int | None) -> None:
+        """Fold the wake up timestamp of a night into the expected wake up time.
+
+        Nights must be learned oldest first, a night not newer than the last
+        learned one is ignored.
+        """
+        if not wake_up_time or (self._last_learned_day is not None and day <= self._last_learned_day):
+            return
+        self._last_learned_day = day
+
+        wake = datetime.datetime.fromtimestamp(wake_up_time)
+        minute = wake.hour * 60 + wake.minute
+        if self._wake_minute is None:
+            self._wake_minute = minute
+            return
+        # Shortest way around the clock, so 23:50 and 0:10 average to midnight
+        delta = (minute - self._wake_minute + MINUTES_PER_DAY / 2) % MINUTES_PER_DAY - MINUTES_PER_DAY / 2
+        self._wake_minute = (self._wake_minute + WAKE_SMOOTHING * delta) % MINUTES_PER_DAY
+
+    def morning_window(self, day: datetime.date) -> tuple[datetime.datetime, datetime.datetime]:
+        """Return the start and end of the polling window on day."""
+        wake = datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(
+            minutes=self.expected_wake_minute
+        )
+        return wake - MORNING_WINDOW_BEFORE, wake + MORNING_WINDOW_AFTER
+
+    def next_interval(self, now: datetime.datetime, last_night_final: bool) -> datetime.timedelta:
+        """Return how long to wait before the next poll."""
+        window_start, window_end = self.morning_window(now.date())
+        if now < window_start:
+            # Still asleep, nothing new before the window opens
+            return window_start - now
+        if not last_night_final:
+            if now < window_end:
+                return ACTIVE_INTERVAL
+            if now + IDLE_INTERVAL < window_start + MORNING_WINDOW_BEFORE + CATCH_UP_END:
+                return IDLE_INTERVAL
+
+        next_window_start, _ = self.morning_window(now.date() + datetime.timedelta(days=1))
+        return next_window_start - now
@@ -0,0 +1,105 @@
+"""Typed model of one night's getday report."""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+import datetime
+from typing import Any
+
+from .metrics import compute_derived_metrics
+from .payload import fingerprint
+from .timeline import EventTimeline, SleepStageTimeline
+
+
+# Timeline fields, stored as plain lists
+EVENT_TIMELINES = ("body_move", "body_revolve", "snore", "snore_count")
+
+
+def _percentage(data: dict, key: str) -> float | None:
+    return (data.get(key) or {}).get("percentage")
+
+
+@dataclass(frozen=True, slots=True)
+class NightReport:
+    """Immutable summary of a night, built once per fetched report.
+
+    Holds the scalar values read by the sensors, the derived time strings and
+    the sleep stages and event arrays packed into timelines. The raw payload is not kept,
+    as_dict is the compact form the report cache stores instead.
+    """
+
+    day: datetime.date
+    fingerprint: str
+    score: int | None
+    go_to_bed_time: int | None
+    wake_up_time: int | None
+    awake_percent: float | None
+    deep_percent: float | None
+    light_percent: float | None
+    rem_percent: float | None
+    heart_beat_avg: float | None
+    breath_avg: float | None
+
+    deep_sleep_time: str
+    light_sleep_time: str
+    rem_time: str
+    awake_time: str
+    revolve_time: str
+    move_time: str
+    vibrate_time: str
+    vibrate_count: int
+    snore_count_time: str
+    snore_count_total: int
+
+    sleep_stages: SleepStageTimeline
+    body_move: EventTimeline
+    body_revolve: EventTimeline
+    snore: EventTimeline
+    snore_count: EventTimeline
+
+    @classmethod
+    def from_getday(cls, day: datetime.date, data: dict) -> NightReport:
+        """Build the model from the data part of a getday response."""
+        return cls(
+            day=day,
+            fingerprint=fingerprint(data),
+            score=data.get("score"),
+            go_to_bed_time=data.get("go_to_bed_time"),
+            wake_up_time=data.get("wake_up_time"),
+            awake_percent=_percentage(data, "awake"),
+            deep_percent=_percentage(data, "deep"),
+            light_percent=_percentage(data, "light"),
+            rem_percent=_percentage(data, "rem"),
+            heart_beat_avg=data.get("heart_beat_avg"),
+            breath_avg=data.get("breath_avg"),
+            **compute_derived_metrics(data),
+            sleep_stages=SleepStageTimeline.from_segments(data.get("sleep_data")),
+            body_move=EventTimeline.from_events(data.get("body_move")),
+            body_revolve=EventTimeline.from_events(data.get("body_revolve")),
+            snore=EventTimeline.from_events(data.get("snore")),
+            snore_count=EventTimeline.from_events(data.get("snore_count")),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> NightReport:
+        """Build the model from a dict saved by as_dict."""
+        values = dict(data)
+        values["day"] = datetime.date.fromisoformat(data["day"])
+        values["sleep_stages"] = SleepStageTimeline.from_list(data["sleep_stages"])
+        for name in EVENT_TIMELINES:
+            values[name] = EventTimeline.from_list(data[name])
+        return cls(**values)
+
+    def as_dict(self) -> dict[str, Any]:
+        data = {field.name: getattr(self, field.name) for field in fields(self)}
+        data["day"] = self.day.isoformat()
+        data["sleep_stages"] = self.sleep_stages.as_list()
+        for name in EVENT_TIMELINES:
+            data[name] = data[name].as_list()
+        return data
+
+    @property
+    def sleep_duration(self) -> int | None:
+        """Seconds between going to bed and waking up."""
+        if not self.go_to_bed_time or not self.wake_up_time:
+            return None
+        return self.wake_up_time - self.go_to_bed_time
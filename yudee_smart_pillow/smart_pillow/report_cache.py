@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import datetime
+import time
+from typing import Any, Callable
+
+from .report import NightReport
+
+# Floor of the overall bound, which grows with the number of devices
+DEFAULT_MAX_ENTRIES = 500
+# Two months per pillow, more than the longest trend window
+DEFAULT_MAX_NIGHTS_PER_DEVICE = 62
+# A night that may still change is served this long after it was fetched,
+# shorter than the active poll interval so every poll sees the amendments
+NOT_FINAL_TTL = 5 * 60
+# How long after wake up the cloud keeps amending last night's report
+REPORT_SETTLE_TIME = 2 * 60 * 60
+
+
+def is_report_final(day: datetime.date, wake_up_time: int | None, now: float | None = None) -> bool:
+    """Return True when the report for day can no longer change."""
+    if now is None:
+        now = time.time()
+    today = datetime.datetime.fromtimestamp(now).date()
+    if day < today - datetime.timedelta(days=1):
+        return True
+
+    if not wake_up_time:
+        return False
+    return now - wake_up_time >= REPORT_SETTLE_TIME
+
+
+class ReportCache:
+    """Per-night NightReport cache keyed by device id and day.
+
+    Final nights are kept until the least recently used are evicted by the
+    per device or the overall bound. The overall bound holds
+    max_nights_per_device nights of every device, and never less than
+    max_entries.
+
+    Nights that may still change are served for NOT_FINAL_TTL only. Polls in
+    the wake up window must see the amended report, so after that they are
+    just a fallback while the cloud is unavailable.
+
+    The cache is storage agnostic: as_dict and load persist it, and on_change
+    is only called when a night changed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        on_change: Callable[[], None] | None = None,
+        max_nights_per_device: int = DEFAULT_MAX_NIGHTS_PER_DEVICE,
+        devices: int = 1,
+    ) -> None:
+        self._min_entries = max_entries
+        self._max_nights_per_device = max_nights_per_device
+        self._max_entries = max(max_entries, devices * max_nights_per_device)
+        self._on_change = on_change
+        # key -> (report, fetched, final)
+        self._entries: OrderedDict[str, tuple[NightReport, float, bool]] = OrderedDict()
+
+    @staticmethod
+    def _key(did: str, day: datetime.date) -> str:
+        return f"{did}_{day.isoformat()}"
+
+    def get(
+        self, did: str, day: datetime.date, allow_stale: bool = False, now: float | None = None
+    ) -> NightReport | None:
+        """Return the cached report, None when missing or expired unless allow_stale."""
+        key = self._key(did, day)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        report, fetched, final = entry
+        if not final and not allow_stale:
+            if now is None:
+                now = time.time()
+            if now - fetched >= NOT_FINAL_TTL:
+                return None
+
+        self._entries.move_to_end(key)
+        return report
+
+    def put(self, did: str, day: datetime.date, report: NightReport, now: float | None = None) -> None:
+        """Store a report, marking it final when the night is over."""
+        if now is None:
+            now = time.time()
+        key = self._key(did, day)
+        final = is_report_final(day, report.wake_up_time, now)
+        previous = self._entries.get(key)
+        self._entries[key] = (report, now, final)
+        self._entries.move_to_end(key)
+        if previous is None:
+            self._evict(did)
+
+        changed = previous is None or previous[0].fingerprint != report.fingerprint or previous[2] != final
+        if changed and self._on_change is not None:
+            self._on_change()
+
+    def set_devices(self, devices: int) -> None:
+        """Scale the overall bound to the number of configured devices."""
+        self._max_entries = max(self._min_entries, devices * self._max_nights_per_device)
+        self._evict_overall()
+
+    def _evict(self, did: str) -> None:
+        prefix = f"{did}_"
+        device_keys = [key for key in self._entries if key.startswith(prefix)]
+        # Oldest used first, like the entries themselves
+        for key in device_keys[: max(0, len(device_keys) - self._max_nights_per_device)]:
+            del self._entries[key]
+        self._evict_overall()
+
+    def _evict_overall(self) -> None:
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def reports(self, did: str) -> list[NightReport]:
+        """Return every cached report of a device, oldest day first."""
+        prefix = f"{did}_"
+        reports = [report for key, (report, _, _) in self._entries.items() if key.startswith(prefix)]
+        return sorted(reports, key=lambda report: report.day)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "entries": [
+                [key, {"report": report.as_dict(), "fetched": fetched, "final": final}]
+                for key, (report, fetched, final) in self._entries.items()
+            ]
+        }
+
+    def load(self, data: dict[str, Any] | None) -> None:
+        """Restore entries saved by as_dict, oldest first."""
+        if not data:
+            return
+        for key, entry in data.get("entries", []):
+            try:
+                report = NightReport.from_dict(entry["report"])
+            except (KeyError, TypeError, ValueError):
+                # Saved before reports were stored compact, fetched again when needed
+                continue
+            self._entries[key] = (report, entry["fetched"], entry["final"])
+        # Saved with other bounds, the device id is the key without its day
+        for did in {key.rpartition("_")[0] for key in self._entries}:
+            self._evict(did)
@@ -0,0 +1,114 @@
+"""Retry and circuit breaker helpers for calls to the Mirahome cloud."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any
+
+from aiohttp import ClientConnectionError, ClientResponseError
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 60.0
+
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 5.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the cloud while the circuit is open."""
+
+
+def is_transient(err: BaseException) -> bool:
+    """Return True for errors worth retrying."""
+    if isinstance(err, ClientResponseError):
+        return err.status == 429 or err.status >= 500
+    return isinstance(err, (asyncio.TimeoutError, ClientConnectionError))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Return the full jitter delay before retry number attempt (1 based)."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Stop calling the cloud after repeated transient failures.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast. Once reset_timeout has passed a single trial call is let
+    through, closing the circuit again when it succeeds.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._last_error: str | None = None
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True when a call may go out now."""
+        if self._state == STATE_CLOSED:
+            return True
+        if self._state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self._reset_timeout:
+                self._rejected += 1
+                return False
+            self._state = STATE_HALF_OPEN
+            self._trial_in_flight = False
+        if self._trial_in_flight:
+            self._rejected += 1
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        if self._state != STATE_CLOSED:
+            _LOGGER.info("Mirahome cloud recovered, closing circuit")
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self, err: BaseException) -> None:
+        self._failures += 1
+        self._last_error = f"{type(err).__name__}: {err}"
+        self._trial_in_flight = False
+        if self._state == STATE_HALF_OPEN or self._failures >= self._failure_threshold:
+            if self._state != STATE_OPEN:
+                _LOGGER.warning("Mirahome cloud unhealthy, opening circuit: %r", err)
+            self._state = STATE_OPEN
+            self._opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """Forget a call that ended without telling anything about the cloud."""
+        self._trial_in_flight = False
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the breaker state for diagnostics."""
+        return {
+            "state": self._state,
+            "consecutive_failures": self._failures,
+            "open_for": None if self._opened_at is None else round(time.monotonic() - self._opened_at, 1),
+            "rejected_calls": self._rejected,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,103 @@
+"""Downsampled per-sample series of a night report for charting."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Any, Iterable
+
+from .report import NightReport
+from .timeline import SleepStageTimeline
+
+# getday array name -> NightReport timeline
+SERIES_SOURCES = {
+    "sleep_data": "sleep_stages",
+    "body_move": "body_move",
+    "body_revolve": "body_revolve",
+    "snore": "snore",
+    "snore_count": "snore_count",
+}
+
+DEFAULT_SERIES_RESOLUTION = 300
+MIN_SERIES_RESOLUTION = 60
+
+
+def downsample(times: array, values: array, resolution: int) -> list[list[int]]:
+    """Reduce sorted samples to at most four [time, value] points per bucket.
+
+    Buckets are resolution seconds long and aligned to the epoch, so series of
+    different nights line up. Every bucket keeps its first, minimum,
+    maximum and last sample (M4), which keeps spikes and steps of the full
+    series. Bucket bounds are found by bisecting, minimum and maximum are taken
+    over array slices, so only non-empty buckets cost Python level work.
+    """
+    points = []
+    count = len(times)
+    index = 0
+    while index < count:
+        bucket_end = (times[index] // resolution + 1) * resolution
+        last = bisect_left(times, bucket_end, index)
+        if last - index <= 4:
+            picks: Iterable[int] = range(index, last)
+        else:
+            bucket = values[index:last]
+            picks = sorted(
+                {index, index + bucket.index(min(bucket)), index + bucket.index(max(bucket)), last - 1}
+            )
+        points.extend([times[pick], values[pick]] for pick in picks)
+        index = last
+    return points
+
+
+def downsample_stages(timeline: SleepStageTimeline, resolution: int) -> list[list[int | None]]:
+    """Reduce sleep stages to the stage covering most of every bucket.
+
+    Stage codes are categories, a minimum or maximum of them means nothing.
+    Buckets are aligned like in downsample, a bucket no segment covers gets
+    None, and runs of buckets with the same stage are merged into one
+    [time, stage] step.
+    """
+    if not len(timeline):
+        return []
+    points: list[list[int | None]] = []
+    start, end = timeline.start, timeline.end
+    bucket = start // resolution * resolution
+    while bucket < end:
+        bucket_end = bucket + resolution
+        stage, seconds = max(timeline.time_in_stages(bucket, bucket_end).items(), key=itemgetter(1))
+        value = stage if seconds > 0 else None
+        if not points or points[-1][1] != value:
+            points.append([max(bucket, start), value])
+        bucket = bucket_end
+    return points
+
+
+def report_series(
+    report: NightReport,
+    resolution: int = DEFAULT_SERIES_RESOLUTION,
+    names: Iterable[str] | None = None,
+) -> dict[str, Any]:
+    """Return the requested arrays of a report downsampled to resolution seconds.
+
+    Sleep stages are a step series of [time, dominant stage] points ending at
+    end, events are M4 reduced [time, value] points.
+    """
+    if resolution < 1:
+        raise ValueError("resolution must be at least 1 second")
+    stages = report.sleep_stages
+
+    series = {}
+    for name in names or SERIES_SOURCES:
+        timeline = getattr(report, SERIES_SOURCES[name])
+        if timeline is stages:
+            series[name] = downsample_stages(stages, resolution)
+        else:
+            series[name] = downsample(timeline.times, timeline.values, resolution)
+
+    return {
+        "day": report.day.isoformat(),
+        "start": stages.start if len(stages) else report.go_to_bed_time,
+        "end": stages.end if len(stages) else report.wake_up_time,
+        "resolution": resolution,
+        "series": series,
+    }
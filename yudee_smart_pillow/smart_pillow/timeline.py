@@ -0,0 +1,190 @@
+"""Array backed timelines of the per-event data of a night report."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any
+
+from .metrics import STATE_AWAKE, STATE_DEEP_SLEEP, STATE_LIGHT_SLEEP, STATE_REM_SLEEP
+
+STAGE_NAMES = {
+    STATE_DEEP_SLEEP: "deep",
+    STATE_LIGHT_SLEEP: "light",
+    STATE_REM_SLEEP: "rem",
+    STATE_AWAKE: "awake",
+}
+
+
+class EventTimeline:
+    """Sorted event timestamps with their values, packed in typed arrays."""
+
+    __slots__ = ("times", "values")
+
+    def __init__(self, times: array, values: array) -> None:
+        self.times = times
+        self.values = values
+
+    @classmethod
+    def from_events(cls, events: list[dict] | None) -> EventTimeline:
+        """Build a timeline from a getday event list ({"time", "value"} dicts)."""
+        events = sorted(events or (), key=lambda event: event["time"])
+        return cls(
+            array("q", [int(event["time"]) for event in events]),
+            array("l", [int(event["value"]) for event in events]),
+        )
+
+    @classmethod
+    def from_list(cls, data: list[list[int]]) -> EventTimeline:
+        """Build a timeline from [times, values] saved by as_list."""
+        times, values = data
+        return cls(array("q", times), array("l", values))
+
+    def as_list(self) -> list[list[int]]:
+        return [self.times.tolist(), self.values.tolist()]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def total(self) -> int:
+        return sum(self.values)
+
+
+class SleepStageTimeline:
+    """Sleep stage segments packed into parallel arrays sorted by start time.
+
+    Per-stage cumulative durations and a transition prefix count are built
+    once, so the interval queries below bisect instead of rescanning.
+    """
+
+    __slots__ = ("starts", "ends", "stages", "_stage_totals", "_transitions")
+
+    def __init__(self, starts: array, ends: array, stages: array) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.stages = stages
+
+        # _stage_totals[stage][i]: seconds spent in stage during the first i segments
+        self._stage_totals: dict[int, array] = {
+            stage: array("q", [0]) for stage in sorted(set(stages))
+        }
+        # _transitions[i]: stage changes between the first i + 1 segments
+        self._transitions = array("l", [0] * len(stages))
+        for index, stage in enumerate(stages):
+            duration = ends[index] - starts[index]
+            for other, totals in self._stage_totals.items():
+                totals.append(totals[-1] + (duration if other == stage else 0))
+            if index:
+                self._transitions[index] = self._transitions[index - 1] + (stage != stages[index - 1])
+
+    @classmethod
+    def from_segments(cls, segments: list[dict] | None) -> SleepStageTimeline:
+        """Build a timeline from getday sleep_data ({"start", "end", "status"} dicts)."""
+        segments = sorted(segments or (), key=lambda segment: segment["start"])
+        starts = array("q", [int(segment["start"]) for segment in segments])
+        ends = array("q", [int(segment["end"]) for segment in segments])
+        # Clip overlapping segments so every instant maps to a single stage
+        for index in range(len(ends) - 1):
+            if ends[index] > starts[index + 1]:
+                ends[index] = starts[index + 1]
+        return cls(starts, ends, array("b", [int(segment["status"]) for segment in segments]))
+
+    @classmethod
+    def from_list(cls, data: list[list[int]]) -> SleepStageTimeline:
+        """Build a timeline from [starts, ends, stages] saved by as_list."""
+        starts, ends, stages = data
+        return cls(array("q", starts), array("q", ends), array("b", stages))
+
+    def as_list(self) -> list[list[int]]:
+        return [self.starts.tolist(), self.ends.tolist(), self.stages.tolist()]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def start(self) -> int | None:
+        return self.starts[0] if self.starts else None
+
+    @property
+    def end(self) -> int | None:
+        return self.ends[-1] if self.ends else None
+
+    def stage_at(self, instant: float) -> int | None:
+        """Return the stage at instant, None outside of any segment."""
+        index = bisect_right(self.starts, instant) - 1
+        if index >= 0 and instant < self.ends[index]:
+            return self.stages[index]
+        return None
+
+    def _span(self, start: float | None, end: float | None) -> tuple[float, float, int, int]:
+        if start is None:
+            start = self.starts[0] if self.starts else 0
+        if end is None:
+            end = self.ends[-1] if self.ends else 0
+        # Segments first..last - 1 overlap [start, end)
+        return start, end, bisect_right(self.ends, start), bisect_left(self.starts, end)
+
+    def time_in_stage(self, stage: int, start: float | None = None, end: float | None = None) -> float:
+        """Return the seconds spent in stage between start and end."""
+        totals = self._stage_totals.get(stage)
+        if totals is None:
+            return 0
+        start, end, first, last = self._span(start, end)
+        # A reversed range would subtract more than the segments hold
+        if first >= last or start >= end:
+            return 0
+
+        seconds = totals[last] - totals[first]
+        if self.stages[first] == stage:
+            seconds -= max(0, start - self.starts[first])
+        if self.stages[last - 1] == stage:
+            seconds -= max(0, self.ends[last - 1] - end)
+        return seconds
+
+    def time_in_stages(self, start: float | None = None, end: float | None = None) -> dict[int, float]:
+        """Return the seconds spent in every stage between start and end."""
+        return {stage: self.time_in_stage(stage, start, end) for stage in self._stage_totals}
+
+    def transition_count(self, start: float | None = None, end: float | None = None) -> int:
+        """Return how many stage changes happen between start and end."""
+        if not self.starts:
+            return 0
+        if start is None:
+            start = self.starts[0]
+        if end is None:
+            end = self.ends[-1]
+        # Change k happens at starts[k], count those in [start, end)
+        first = max(bisect_left(self.starts, start), 1)
+        last = bisect_left(self.starts, end)
+        if first >= last:
+            return 0
+        return self._transitions[last - 1] - self._transitions[first - 1]
+
+
+def stage_summary(
+    timeline: SleepStageTimeline,
+    start: float | None = None,
+    end: float | None = None,
+    at: float | None = None,
+) -> dict[str, Any]:
+    """Answer the interval queries of a night with stage names, for callers outside of Python.
+
+    Seconds in every known stage and the stage changes between start and end,
+    the whole night by default, plus the stage at instant at when given.
+    """
+    if start is None:
+        start = timeline.start
+    if end is None:
+        end = timeline.end
+    summary: dict[str, Any] = {
+        "start": start,
+        "end": end,
+        "seconds_in_stage": {
+            name: timeline.time_in_stage(stage, start, end) for stage, name in STAGE_NAMES.items()
+        },
+        "transitions": timeline.transition_count(start, end),
+    }
+    if at is not None:
+        stage = timeline.stage_at(at)
+        summary["stage_at"] = None if stage is None else STAGE_NAMES.get(stage, str(stage))
+    return summary
@@ -0,0 +1,120 @@
+"""Per phase timing of refreshes, kept as rolling histograms."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+import contextlib
+import time
+from typing import Any, Iterator
+
+PHASE_TOKEN = "token"
+PHASE_QUEUE = "queue"
+PHASE_HTTP = "http"
+PHASE_DECODE = "decode"
+PHASE_METRICS = "metrics"
+PHASE_DISPATCH = "dispatch"
+PHASE_REFRESH = "refresh"
+# Refreshes the report cache answered without a cloud request, kept apart so
+# they do not pull the refresh percentiles down
+PHASE_CACHED_REFRESH = "cached_refresh"
+
+PHASES = (
+    PHASE_TOKEN,
+    PHASE_QUEUE,
+    PHASE_HTTP,
+    PHASE_DECODE,
+    PHASE_METRICS,
+    PHASE_DISPATCH,
+    PHASE_REFRESH,
+    PHASE_CACHED_REFRESH,
+)
+
+# Upper bounds of the histogram buckets in milliseconds, the last bucket is open
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Samples per phase the histograms are computed over
+TIMING_WINDOW = 100
+
+
+class RollingHistogram:
+    """Fixed bucket histogram of the last window samples.
+
+    Adding a sample moves one bucket count in and at most one out, so the
+    histogram never has to be rebuilt from the samples.
+    """
+
+    __slots__ = ("_samples", "_counts", "_total")
+
+    def __init__(self, window: int = TIMING_WINDOW) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self._total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, milliseconds: float) -> None:
+        samples = self._samples
+        if len(samples) == samples.maxlen:
+            evicted = samples[0]
+            self._counts[bisect_left(BUCKET_BOUNDS_MS, evicted)] -= 1
+            self._total -= evicted
+        samples.append(milliseconds)
+        self._counts[bisect_left(BUCKET_BOUNDS_MS, milliseconds)] += 1
+        self._total += milliseconds
+
+    @property
+    def last(self) -> float | None:
+        return self._samples[-1] if self._samples else None
+
+    def percentile(self, percent: float) -> float | None:
+        """Nearest rank percentile of the samples in the window."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))]
+
+    def as_dict(self) -> dict[str, Any]:
+        if not self._samples:
+            return {"count": 0}
+        labels = [f"<={bound}ms" for bound in BUCKET_BOUNDS_MS] + [f">{BUCKET_BOUNDS_MS[-1]}ms"]
+        return {
+            "count": len(self._samples),
+            "last": round(self._samples[-1], 3),
+            "mean": round(self._total / len(self._samples), 3),
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "max": round(max(self._samples), 3),
+            "buckets": {label: count for label, count in zip(labels, self._counts) if count},
+        }
+
+
+class RefreshTimings:
+    """Rolling histograms of how long every phase of a device's refreshes takes.
+
+    Phases can nest: token includes the login round trip, which is also
+    recorded under http, and refresh covers the whole update. An update
+    served from the cache is recorded under cached_refresh instead.
+    """
+
+    def __init__(self, window: int = TIMING_WINDOW) -> None:
+        self._histograms = {phase: RollingHistogram(window) for phase in PHASES}
+
+    def record(self, phase: str, seconds: float) -> None:
+        self._histograms[phase].add(seconds * 1000)
+
+    @contextlib.contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        """Time the block under phase, whether it returns or raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def last(self, phase: str) -> float | None:
+        """Milliseconds taken by the last phase, None before the first one."""
+        return self._histograms[phase].last
+
+    def as_dict(self) -> dict[str, Any]:
+        return {phase: histogram.as_dict() for phase, histogram in self._histograms.items()}
@@ -0,0 +1,154 @@
+"""Rolling averages of nightly values, updated in constant time per night."""
+from __future__ import annotations
+
+from collections import deque
+import datetime
+import math
+from typing import Any, Callable
+
+from .report import NightReport
+
+TREND_WINDOWS = (7, 30)
+
+
+def sleep_duration_hours(report: NightReport) -> float | None:
+    """Return the hours between going to bed and waking up, rounded to 0.1."""
+    if (duration := report.sleep_duration) is None:
+        return None
+    return round(duration / 3600, 1)
+
+
+# Nightly values followed by the trends, by the key of the sensor showing them
+TREND_VALUE_FUNCS: dict[str, Callable[[NightReport], float | None]] = {
+    "score": lambda report: report.score,
+    "heart_beat_avg": lambda report: report.heart_beat_avg,
+    "breath_rate_avg": lambda report: report.breath_avg,
+    "SLEEP_DURATION_HR": sleep_duration_hours,
+    "SLEEP_SNORE_COUNT": lambda report: report.snore_count_total,
+}
+TREND_METRICS = tuple(TREND_VALUE_FUNCS)
+
+
+def trend_values(report: NightReport) -> dict[str, float | None]:
+    """Return the values of a night for the trends."""
+    return {metric: value_func(report) for metric, value_func in TREND_VALUE_FUNCS.items()}
+
+
+class RollingStat:
+    """Mean and standard deviation of the values currently in a window.
+
+    Values are added and removed with Welford's update, so moving the window
+    never revisits the values still inside it.
+    """
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def remove(self, value: float) -> None:
+        if self.count <= 1:
+            self.count = 0
+            self.mean = 0.0
+            self._m2 = 0.0
+            return
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        # A single value has no spread, drop the rounding left over from removals
+        self._m2 = 0.0 if self.count == 1 else max(0.0, self._m2 - delta * (value - self.mean))
+
+    @property
+    def std_dev(self) -> float | None:
+        """Population standard deviation, None for an empty window."""
+        if not self.count:
+            return None
+        return math.sqrt(self._m2 / self.count)
+
+
+class _Window:
+    __slots__ = ("days", "nights", "stats")
+
+    def __init__(self, days: int, metrics: tuple[str, ...]) -> None:
+        self.days = days
+        self.nights: deque[tuple[datetime.date, dict[str, float | None]]] = deque()
+        self.stats = {metric: RollingStat() for metric in metrics}
+
+    def _apply(self, values: dict[str, float | None], update: Callable[[RollingStat, float], None]) -> None:
+        for metric, stat in self.stats.items():
+            if (value := values.get(metric)) is not None:
+                update(stat, value)
+
+    def push(self, day: datetime.date, values: dict[str, float | None]) -> None:
+        self.nights.append((day, values))
+        self._apply(values, RollingStat.add)
+        first_day = day - datetime.timedelta(days=self.days - 1)
+        while self.nights[0][0] < first_day:
+            self._apply(self.nights.popleft()[1], RollingStat.remove)
+
+    def pop(self) -> None:
+        self._apply(self.nights.pop()[1], RollingStat.remove)
+
+
+class NightlyTrends:
+    """Rolling statistics of nightly values over the last 7 and 30 days.
+
+    Nights are kept in a ring buffer sized to the longest window, which is
+    what gets persisted. A night for the same day as the newest one
+    replaces it, since the cloud amends last night's report during the day.
+    """
+
+    def __init__(
+        self,
+        metrics: tuple[str, ...],
+        windows: tuple[int, ...] = TREND_WINDOWS,
+        on_change: Callable[[], None] | None = None,
+    ) -> None:
+        self._metrics = metrics
+        self._on_change = on_change
+        self._nights: deque[tuple[datetime.date, dict[str, float | None]]] = deque(maxlen=max(windows))
+        self._windows = {days: _Window(days, metrics) for days in windows}
+
+    def _add(self, day: datetime.date, values: dict[str, float | None]) -> bool:
+        if self._nights:
+            newest = self._nights[-1][0]
+            if day < newest:
+                return False
+            if day == newest:
+                if self._nights[-1][1] == values:
+                    return False
+                self._nights.pop()
+                for window in self._windows.values():
+                    window.pop()
+
+        self._nights.append((day, values))
+        for window in self._windows.values():
+            window.push(day, values)
+        return True
+
+    def add_night(self, day: datetime.date, values: dict[str, float | None]) -> None:
+        """Add the values of a night, ignoring nights older than the newest one."""
+        values = {metric: values.get(metric) for metric in self._metrics}
+        if self._add(day, values) and self._on_change is not None:
+            self._on_change()
+
+    def stat(self, metric: str, days: int) -> RollingStat:
+        return self._windows[days].stats[metric]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"nights": [[day.isoformat(), values] for day, values in self._nights]}
+
+    def load(self, data: dict[str, Any] | None) -> None:
+        """Restore nights saved by as_dict, oldest first."""
+        if not data:
+            return
+        for day, values in data.get("nights", []):
+            self._add(datetime.date.fromisoformat(day), {metric: values.get(metric) for metric in self._metrics})
@@ -0,0 +1,148 @@
+"""Token handling shared by all YUDEE Pillow coordinators."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .smart_pillow.pillow_api import PillowCloudAPI
+
+_LOGGER = logging.getLogger(__name__)
+
+TOKEN_LIFETIME = timedelta(days=15)
+# Refresh tokens in the background this long before they expire
+TOKEN_REFRESH_MARGIN = timedelta(hours=12)
+# Coalesce config entry writes of refreshed tokens
+TOKEN_SAVE_DELAY = 10
+
+
+class TokenManager:
+    """Hand out fastlogin tokens with at most one login in flight per entry.
+
+    Tokens and their expiration are tracked in memory, refreshed before they
+    expire and written back to the config entries in batches.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._tokens: dict[str, tuple[str, float]] = {}
+        self._logins: dict[str, asyncio.Task] = {}
+        self._refresh_unsubs: dict[str, CALLBACK_TYPE] = {}
+        self._pending_writes: dict[str, ConfigEntry] = {}
+        self._flush_unsub: CALLBACK_TYPE | None = None
+
+    async def async_get_token(self, entry: ConfigEntry, api: PillowCloudAPI) -> str:
+        """Return a valid token, logging in only when needed."""
+        cached = self._tokens.get(entry.entry_id)
+        if cached is None and entry.data.get("token") is not None and entry.data.get("expiration"):
+            cached = (entry.data["token"], entry.data["expiration"])
+            self._tokens[entry.entry_id] = cached
+            self._schedule_refresh(entry, api, cached[1])
+
+        if cached is not None and cached[1] > datetime.now().timestamp():
+            return cached[0]
+
+        return await self.async_refresh_token(entry, api)
+
+    async def async_refresh_token(self, entry: ConfigEntry, api: PillowCloudAPI) -> str:
+        """Log in again, joining a login that is already in flight."""
+        login = self._logins.get(entry.entry_id)
+        if login is None:
+            login = self._hass.async_create_task(self._async_login(entry, api))
+            self._logins[entry.entry_id] = login
+            login.add_done_callback(self._login_done(entry.entry_id))
+
+        # Shield the shared login so one cancelled caller does not abort it for all
+        return await asyncio.shield(login)
+
+    @callback
+    def async_invalidate(self, entry: ConfigEntry, token: str) -> None:
+        """Forget token after the cloud rejected it."""
+        cached = self._tokens.get(entry.entry_id)
+        if cached is not None and cached[0] == token:
+            self._tokens.pop(entry.entry_id)
+
+    @callback
+    def async_remove_entry(self, entry: ConfigEntry) -> None:
+        """Stop tracking an unloaded entry."""
+        if unsub := self._refresh_unsubs.pop(entry.entry_id, None):
+            unsub()
+        if entry.entry_id in self._pending_writes:
+            self._async_write_entry(self._pending_writes.pop(entry.entry_id))
+        self._tokens.pop(entry.entry_id, None)
+        # A login still in flight finishes for its callers but is not tracked anymore
+        self._logins.pop(entry.entry_id, None)
+
+    def _login_done(self, entry_id: str):
+        @callback
+        def _done(login: asyncio.Task) -> None:
+            # The entry may have been removed and set up again with a login of its own
+            if self._logins.get(entry_id) is login:
+                self._logins.pop(entry_id)
+            if not login.cancelled():
+                # Callers that hit their refresh deadline no longer await the shared login
+                login.exception()
+
+        return _done
+
+    async def _async_login(self, entry: ConfigEntry, api: PillowCloudAPI) -> str:
+        _LOGGER.debug("Login for %s", api.did)
+        token = await api.get_token()
+        if self._logins.get(entry.entry_id) is not asyncio.current_task():
+            # Entry removed while logging in, do not bring back its token or refresh timer
+            return token
+        expiration = (datetime.now() + TOKEN_LIFETIME).timestamp()
+        self._tokens[entry.entry_id] = (token, expiration)
+        self._schedule_refresh(entry, api, expiration)
+        self._schedule_write(entry)
+        return token
+
+    @callback
+    def _schedule_refresh(self, entry: ConfigEntry, api: PillowCloudAPI, expiration: float) -> None:
+        if unsub := self._refresh_unsubs.pop(entry.entry_id, None):
+            unsub()
+
+        delay = max(expiration - TOKEN_REFRESH_MARGIN.total_seconds() - datetime.now().timestamp(), 0)
+
+        @callback
+        def _refresh(_now: datetime) -> None:
+            self._refresh_unsubs.pop(entry.entry_id, None)
+            self._hass.async_create_task(self._async_background_refresh(entry, api))
+
+        self._refresh_unsubs[entry.entry_id] = async_call_later(self._hass, delay, _refresh)
+
+    async def _async_background_refresh(self, entry: ConfigEntry, api: PillowCloudAPI) -> None:
+        try:
+            await self.async_refresh_token(entry, api)
+        except Exception as err:  # pylint: disable=broad-except
+            # The next data fetch logs in on demand
+            _LOGGER.warning("Background token refresh for %s failed: %s", api.did, err)
+
+    @callback
+    def _schedule_write(self, entry: ConfigEntry) -> None:
+        self._pending_writes[entry.entry_id] = entry
+        if self._flush_unsub is None:
+            self._flush_unsub = async_call_later(self._hass, TOKEN_SAVE_DELAY, self._async_flush)
+
+    @callback
+    def _async_flush(self, _now: datetime) -> None:
+        self._flush_unsub = None
+        pending, self._pending_writes = self._pending_writes, {}
+        for entry in pending.values():
+            self._async_write_entry(entry)
+
+    @callback
+    def _async_write_entry(self, entry: ConfigEntry) -> None:
+        if (cached := self._tokens.get(entry.entry_id)) is None:
+            return
+        token, expiration = cached
+        if entry.data.get("token") == token and entry.data.get("expiration") == expiration:
+            return
+        entry_data = entry.data.copy()
+        entry_data["token"] = token
+        entry_data["expiration"] = expiration
+        self._hass.config_entries.async_update_entry(entry, data=entry_data)